@@ -0,0 +1,56 @@
+"""Micro-benchmark attribute reads and writes on jsontree, compared with
+the previous exception driven __getattribute__ implementation.
+
+    python benchmarks/bench_access.py
+"""
+import collections
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+class legacy_jsontree(collections.defaultdict):
+    def __init__(self, *args, **kwdargs):
+        super(legacy_jsontree, self).__init__(legacy_jsontree, *args,
+                                              **kwdargs)
+
+    def __getattribute__(self, name):
+        try:
+            return object.__getattribute__(self, name)
+        except AttributeError:
+            return self[name]
+
+    def __setattr__(self, name, value):
+        self[name] = value
+        return value
+
+
+def make(cls):
+    tree = cls()
+    tree.config.server.port = 8080
+    return tree
+
+
+def main(number=500000):
+    cases = [
+        ('read tree.config.server.port',
+         lambda tree: lambda: tree.config.server.port),
+        ('write tree.config.server.port',
+         lambda tree: lambda: setattr(tree.config.server, 'port', 8081)),
+        ('method lookup tree.keys', lambda tree: lambda: tree.keys),
+    ]
+    for name, case in cases:
+        results = []
+        for cls in (legacy_jsontree, jsontree.jsontree):
+            func = case(make(cls))
+            best = min(timeit.repeat(func, number=number, repeat=3))
+            results.append(best / number * 1e9)
+        print('%-32s before %6.0f ns  after %6.0f ns  %5.1fx' % (
+            name, results[0], results[1], results[0] / results[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Compare jsontree.loads, dumps and clone(normalize=True) across the
+registered backends.
+
+    python benchmarks/bench_backends.py
+"""
+import datetime
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_document(records=20000):
+    now = datetime.datetime(2013, 4, 29, 22, 45, 35, 294303)
+    return json.dumps([{
+        'id': i,
+        'name': 'record %d' % i,
+        'created_at': (now + datetime.timedelta(seconds=i)).isoformat(),
+        'tags': ['alpha', 'beta', str(i)],
+        'meta': {'status': 'open', 'score': i * 0.5, 'nested': [[i, 'x']]},
+    } for i in range(records)])
+
+
+def main():
+    doc = make_document()
+    tree = jsontree.loads(doc)
+    size = len(doc) / 1e6
+    print('document: %.1f MB, backends: %s' % (size,
+                                                ', '.join(jsontree.backends())))
+    for label, func in [
+            ('loads', lambda name: jsontree.loads(doc, backend=name)),
+            ('dumps', lambda name: jsontree.dumps(tree, backend=name)),
+            ('clone(normalize=True)',
+             lambda name: jsontree.clone(tree, normalize=True,
+                                         backend=name))]:
+        base = None
+        for name in jsontree.backends():
+            assert jsontree.loads(jsontree.dumps(tree, backend=name)) == tree
+            assert jsontree.loads(doc, backend=name) == tree
+            best = min(timeit.repeat(lambda: func(name), number=1, repeat=5))
+            base = base or best
+            print('%-24s %-10s %8.3fs %8.1f MB/s %6.2fx' % (
+                label, name, best, size / best, base / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Compare the size and the dump and load times of the binary dumpb/loadb
+format, with and without the msgpack accelerated path, against the JSON
+text path of dumps/loads.
+
+    python benchmarks/bench_binary.py
+"""
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_tree(records=20000):
+    now = datetime.datetime(2013, 4, 29, 22, 45, 35, 294303,
+                            tzinfo=jsontree._tzinfo('-0400'))
+    return [jsontree.jsontree(
+        id=i,
+        name='record %d' % i,
+        created_at=now + datetime.timedelta(seconds=i),
+        updated_at=now + datetime.timedelta(minutes=i),
+        tags=['alpha', 'beta', str(i)],
+        meta={'status': 'open', 'score': i * 0.5, 'nested': [[i, 'x']]},
+    ) for i in range(records)]
+
+
+def main():
+    tree = make_tree()
+    text = jsontree.dumps(tree)
+    data = jsontree.dumpb(tree)
+    assert jsontree.loadb(data) == jsontree.loads(text) == tree
+    assert jsontree.loadb(data, accelerate=False) == tree
+    print('json %.2f MB, binary %.2f MB (%.0f%%)' % (
+        len(text) / 1e6, len(data) / 1e6, 100.0 * len(data) / len(text)))
+    cases = [
+        ('dumps', lambda: jsontree.dumps(tree)),
+        ('dumpb', lambda: jsontree.dumpb(tree)),
+        ('loads', lambda: jsontree.loads(text)),
+        ('loadb', lambda: jsontree.loadb(data)),
+        ('loadb(accelerate=False)',
+         lambda: jsontree.loadb(data, accelerate=False)),
+    ]
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        print('%-28s %8.3fs' % (name, best))
+
+
+if __name__ == '__main__':
+    main()
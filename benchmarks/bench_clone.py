@@ -0,0 +1,40 @@
+"""Compare the structural clone with the JSON round-trip clone.
+
+    python benchmarks/bench_clone.py
+"""
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_template():
+    template = jsontree.jsontree()
+    template.method = 'POST'
+    template.headers.accept = 'application/json'
+    template.headers.user_agent = 'jsontree'
+    template.body.created = datetime.datetime(2013, 4, 29, 22, 45, 35)
+    template.body.fields = [jsontree.jsontree(name='field%d' % i, value=i)
+                            for i in range(20)]
+    template.body.tags = ['alpha', 'beta', 'gamma']
+    return template
+
+
+def main(number=2000):
+    template = make_template()
+    assert jsontree.clone(template) == jsontree.clone(template, normalize=True)
+    base = None
+    for name, kwdargs in [('clone(normalize=True)', dict(normalize=True)),
+                          ('clone()', {})]:
+        best = min(timeit.repeat(lambda: jsontree.clone(template, **kwdargs),
+                                 number=number, repeat=3))
+        base = base or best
+        print('%-24s %8.1f us/clone %6.1fx' % (name, best / number * 1e6,
+                                               base / best))
+
+
+if __name__ == '__main__':
+    main()
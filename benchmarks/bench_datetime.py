@@ -0,0 +1,29 @@
+"""Time jsontree's datetime decoder on non-date strings and on timestamps.
+
+    python benchmarks/bench_datetime.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+SAMPLES = [
+    ('short text', 'open'),
+    ('long text', 'The quick brown fox jumps over the lazy dog'),
+    ('naive timestamp', '2013-04-29T22:45:35.294303'),
+    ('offset timestamp', '2013-04-29T22:45:35.4361-04:00'),
+]
+
+
+def main(number=200000):
+    decode = jsontree._datetimedecoder
+    for name, value in SAMPLES:
+        best = min(timeit.repeat(lambda: decode(value), number=number,
+                                 repeat=3))
+        print('%-20s %8.0f ns/call' % (name, best / number * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Compare jsontree.loads on the C accelerated and pure python scanners
+against plain json.loads.
+
+    python benchmarks/bench_decode.py
+"""
+import datetime
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_document(records=20000):
+    now = datetime.datetime(2013, 4, 29, 22, 45, 35, 294303)
+    return json.dumps([{
+        'id': i,
+        'name': 'record %d' % i,
+        'created_at': (now + datetime.timedelta(seconds=i)).isoformat(),
+        'tags': ['alpha', 'beta', str(i)],
+        'meta': {'status': 'open', 'score': i * 0.5, 'nested': [[i, 'x']]},
+    } for i in range(records)])
+
+
+def main():
+    doc = make_document()
+    assert jsontree.loads(doc) == jsontree.loads(doc, accelerate=False)
+    size = len(doc) / 1e6
+    cases = [
+        ('json.loads', lambda: json.loads(doc)),
+        ('jsontree.loads', lambda: jsontree.loads(doc)),
+        ('jsontree.loads(accelerate=False)',
+         lambda: jsontree.loads(doc, accelerate=False)),
+    ]
+    print('document: %.1f MB' % size)
+    base = None
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        base = base or best
+        print('%-36s %8.3fs %8.1f MB/s %6.1fx' % (name, best, size / best,
+                                                  best / base))
+
+
+if __name__ == '__main__':
+    main()
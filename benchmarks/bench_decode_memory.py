@@ -0,0 +1,53 @@
+"""Measure the tracemalloc peak and time of decoding a large nested document when
+jsontree nodes are built directly from the key/value pairs, compared with
+building a dict and copying it (which an object_hook still forces).
+
+    python benchmarks/bench_decode_memory.py
+"""
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_document(records=20000):
+    return json.dumps([{
+        'id': i,
+        'name': 'record %d' % i,
+        'owner': {'id': i % 97, 'login': 'user%d' % (i % 97),
+                  'links': {'self': '/users/%d' % (i % 97)}},
+        'fields': {'priority': {'id': 3, 'name': 'Major'},
+                   'status': {'id': 1, 'name': 'Open'}},
+    } for i in range(records)])
+
+
+def peak(doc, **kwdargs):
+    tracemalloc.start()
+    jsontree.loads(doc, **kwdargs)
+    result = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result
+
+
+def main():
+    doc = make_document()
+    cases = [
+        ('python scanner, dict then copy',
+         dict(accelerate=False, object_hook=lambda obj: obj)),
+        ('python scanner, direct', dict(accelerate=False)),
+        ('C scanner, direct', {}),
+    ]
+    print('document: %.1f MB' % (len(doc) / 1e6))
+    for name, kwdargs in cases:
+        best = min(timeit.repeat(lambda: jsontree.loads(doc, **kwdargs),
+                                 number=1, repeat=3))
+        print('%-32s %8.1f MB peak %8.3fs' % (
+            name, peak(doc, **kwdargs) / 1e6, best))
+
+
+if __name__ == '__main__':
+    main()
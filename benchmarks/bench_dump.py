@@ -0,0 +1,56 @@
+"""Compare peak memory and time of dump against the streaming dump_iter
+and dump_lines when writing many records.
+
+    python benchmarks/bench_dump.py
+"""
+import datetime
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+class NullFile(object):
+    def write(self, data):
+        return len(data)
+
+
+def records(count=100000):
+    start = datetime.datetime(2013, 4, 29, 22, 45, 35)
+    for i in range(count):
+        record = jsontree.jsontree()
+        record.id = i
+        record.at = start + datetime.timedelta(seconds=i)
+        record.meta.status = 'open'
+        record.meta.tags = ['alpha', 'beta']
+        yield record
+
+
+def measure(func):
+    tracemalloc.start()
+    begin = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - begin
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    cases = [
+        ('dump(list)', lambda: jsontree.dump(list(records()), NullFile())),
+        ('dump_iter(generator)',
+         lambda: jsontree.dump_iter(records(), NullFile())),
+        ('dump_lines(generator)',
+         lambda: jsontree.dump_lines(records(), NullFile())),
+    ]
+    for name, func in cases:
+        elapsed, peak = measure(func)
+        print('%-24s %8.3fs %10.1f MB peak' % (name, elapsed, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
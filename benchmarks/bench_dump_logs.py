@@ -0,0 +1,64 @@
+"""Compare dumps and dump on a corpus of timestamped log records against
+the previous isinstance based JSONTreeEncoder.default and json.dump's pure
+python encoder.
+
+    python benchmarks/bench_dump_logs.py
+"""
+import datetime
+import decimal
+import io
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+class legacy_encoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime.datetime):
+            return obj.isoformat()
+        elif isinstance(obj, jsontree.frozenjsontree):
+            return dict(zip(obj._keys, obj._values()))
+        return super(legacy_encoder, self).default(obj)
+
+
+def make_records(count=50000):
+    now = datetime.datetime(2013, 4, 29, 22, 45, 35, 294303)
+    return [jsontree.jsontree(
+        ts=now + datetime.timedelta(milliseconds=i * 7),
+        # Batches of records share the time they were received.
+        received=now + datetime.timedelta(seconds=i // 100),
+        level=['INFO', 'WARNING', 'ERROR'][i % 3],
+        logger='app.db',
+        message='query %d done' % i,
+        duration=i * 0.25,
+    ) for i in range(count)]
+
+
+def main():
+    records = make_records()
+    assert jsontree.dumps(records) == json.dumps(records, cls=legacy_encoder)
+    cases = [
+        ('legacy dumps', lambda: json.dumps(records, cls=legacy_encoder)),
+        ('dumps', lambda: jsontree.dumps(records)),
+        ('legacy dump (json.dump)',
+         lambda: json.dump(records, io.StringIO(), cls=legacy_encoder)),
+        ('dump', lambda: jsontree.dump(records, io.StringIO())),
+        ('dumps(indent=2)', lambda: jsontree.dumps(records, indent=2)),
+    ]
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=7))
+        print('%-28s %8.3fs' % (name, best))
+    extra = [dict(record, day=record.ts.date(), cost=decimal.Decimal('0.25'),
+                  elapsed=datetime.timedelta(milliseconds=7))
+             for record in records[:10000]]
+    best = min(timeit.repeat(lambda: jsontree.dumps(extra), number=1,
+                             repeat=7))
+    print('%-28s %8.3fs' % ('dumps date/Decimal/timedelta', best))
+
+
+if __name__ == '__main__':
+    main()
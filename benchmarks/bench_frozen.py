@@ -0,0 +1,46 @@
+"""Report retained bytes per decoded record for jsontree nodes compared
+with frozenjsontree records, and the cost of decoding each way.
+
+    python benchmarks/bench_frozen.py
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_document(records=50000):
+    return json.dumps([{
+        'id': i,
+        'status': 'open',
+        'priority': i % 5,
+        'owner': {'id': i % 97, 'login': 'user%d' % (i % 97)},
+        'tags': ['alpha', 'beta'],
+    } for i in range(records)])
+
+
+def measure(doc, records, **kwdargs):
+    begin = time.perf_counter()
+    jsontree.loads(doc, **kwdargs)
+    elapsed = time.perf_counter() - begin
+    tracemalloc.start()
+    tree = jsontree.loads(doc, **kwdargs)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tree
+    return elapsed, size / float(records)
+
+
+def main(records=50000):
+    doc = make_document(records)
+    for name, kwdargs in [('jsontree', {}), ('frozen=True', dict(frozen=True))]:
+        elapsed, per_record = measure(doc, records, **kwdargs)
+        print('%-14s %8.0f bytes/record %8.3fs' % (name, per_record, elapsed))
+
+
+if __name__ == '__main__':
+    main()
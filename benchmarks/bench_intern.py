@@ -0,0 +1,50 @@
+"""Measure the memory retained by, and the time of, decoding an array of
+homogeneous records with repeated values, with and without intern=True.
+
+    python benchmarks/bench_intern.py
+"""
+import datetime
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_document(records=50000):
+    now = datetime.datetime(2013, 4, 29, 22, 45, 35)
+    return json.dumps([{
+        'id': i,
+        'status': ['open', 'closed', 'resolved', 'reopened'][i % 4],
+        'priority': {'name': ['Minor', 'Major', 'Critical'][i % 3]},
+        'created_at': (now + datetime.timedelta(minutes=i % 500)).isoformat(),
+        'labels': ['backend', 'team-%d' % (i % 20)],
+    } for i in range(records)])
+
+
+def retained(doc, **kwdargs):
+    tracemalloc.start()
+    result = jsontree.loads(doc, **kwdargs)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    doc = make_document()
+    assert jsontree.loads(doc) == jsontree.loads(doc, intern=True)
+    print('document: %.1f MB' % (len(doc) / 1e6))
+    for name, kwdargs in [('loads', {}), ('loads(intern=True)',
+                                          {'intern': True})]:
+        best = min(timeit.repeat(lambda: jsontree.loads(doc, **kwdargs),
+                                 number=1, repeat=5))
+        print('%-24s %8.1f MB retained %8.3fs' % (
+            name, retained(doc, **kwdargs) / 1e6, best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Compare eager and lazy decoding for a workload that reads only a few
+fields of a large response.
+
+    python benchmarks/bench_lazy.py
+"""
+import datetime
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_document(records=20000):
+    now = datetime.datetime(2013, 4, 29, 22, 45, 35)
+    return json.dumps({
+        'meta': {'status': 'ok', 'total': records},
+        'data': {'issues': [{
+            'id': i,
+            'summary': 'issue %d' % i,
+            'created_at': (now + datetime.timedelta(minutes=i)).isoformat(),
+            'fields': {'priority': {'name': 'Major'}, 'labels': ['a', 'b']},
+        } for i in range(records)]},
+    })
+
+
+def touch(tree):
+    return tree.meta.status, tree.meta.total
+
+
+def main():
+    doc = make_document()
+    cases = [
+        ('json.loads', lambda: json.loads(doc)),
+        ('jsontree.loads', lambda: touch(jsontree.loads(doc))),
+        ('jsontree.loads(lazy=True)',
+         lambda: touch(jsontree.loads(doc, lazy=True))),
+    ]
+    print('document: %.1f MB' % (len(doc) / 1e6))
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        print('%-28s %8.4fs' % (name, best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Measure loads_many throughput from 1 worker up to the number of CPUs.
+
+    python benchmarks/bench_parallel.py
+"""
+import datetime
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_documents(count=2000):
+    now = datetime.datetime(2013, 4, 29, 22, 45, 35)
+    return [json.dumps({
+        'id': i,
+        'events': [{'at': (now + datetime.timedelta(seconds=j)).isoformat(),
+                    'kind': 'update', 'value': j} for j in range(100)],
+    }) for i in range(count)]
+
+
+def main():
+    documents = make_documents()
+    size = sum(len(document) for document in documents) / 1e6
+    print('%d documents, %.1f MB, %d CPUs' % (
+        len(documents), size, multiprocessing.cpu_count()))
+    base = None
+    for workers in range(1, multiprocessing.cpu_count() + 1):
+        begin = time.perf_counter()
+        for tree in jsontree.loads_many(documents, workers=workers):
+            pass
+        elapsed = time.perf_counter() - begin
+        base = base or elapsed
+        print('workers=%-3d %8.3fs %8.1f MB/s %6.2fx' % (
+            workers, elapsed, size / elapsed, base / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Compare compiled path accessors with hand-written attribute chains.
+
+    python benchmarks/bench_path.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+
+def make_tree():
+    return jsontree.loads(
+        '{"a": {"b": [0, 1, 2, {"c": "deep"}]},'
+        ' "items": [' + ', '.join('{"id": %d}' % i for i in range(20)) + ']}')
+
+
+def safe_chain(tree):
+    # What a hand-written lookup must do to avoid auto-vivification.
+    b = tree.get('a', {}).get('b')
+    if not isinstance(b, list) or len(b) <= 3:
+        return None
+    return b[3].get('c')
+
+
+def main(number=200000):
+    tree = make_tree()
+    get_c = jsontree.path('a.b[3].c')
+    ids = jsontree.path('items[*].id')
+    cases = [
+        ('tree.a.b[3].c', lambda: tree.a.b[3].c),
+        ('safe .get() chain', lambda: safe_chain(tree)),
+        ("path('a.b[3].c')", lambda: get_c(tree)),
+        ('[item.id for item in tree["items"]]',
+         lambda: [item.id for item in tree['items']]),
+        ("path('items[*].id')", lambda: ids(tree)),
+    ]
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=number, repeat=3))
+        print('%-38s %8.0f ns/call' % (name, best / number * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Measure the time and memory saved by sharing tzinfo instances when
+decoding offset-bearing timestamps.
+
+    python benchmarks/bench_tzinfo.py
+"""
+import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+OFFSETS = ['-04:00', '+05:30', '+00:00', '-0800']
+
+
+def make_document(records=100000):
+    start = datetime.datetime(2013, 4, 29, 22, 45, 35, 436100)
+    return json.dumps([
+        (start + datetime.timedelta(seconds=i)).isoformat() +
+        OFFSETS[i % len(OFFSETS)] for i in range(records)])
+
+
+def unshared(dtstr):
+    # The previous behaviour: a new tzinfo for every timestamp.
+    result = jsontree._datetimedecoder(dtstr)
+    if isinstance(result, datetime.datetime) and result.tzinfo is not None:
+        offset = dtstr[-6:] if dtstr[-3] == ':' else dtstr[-5:]
+        result = result.replace(tzinfo=jsontree._FixedTzOffset(offset))
+    return result
+
+
+def measure(doc, **kwdargs):
+    begin = time.perf_counter()
+    jsontree.loads(doc, **kwdargs)
+    elapsed = time.perf_counter() - begin
+    tracemalloc.start()
+    tree = jsontree.loads(doc, **kwdargs)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tree
+    return elapsed, size
+
+
+def main():
+    doc = make_document()
+    for name, kwdargs in [('new tzinfo per value',
+                           dict(datetimedecoder=unshared)),
+                          ('shared tzinfo', {})]:
+        elapsed, size = measure(doc, **kwdargs)
+        print('%-22s %8.3fs %8.1f MB retained' % (name, elapsed, size / 1e6))
+
+
+if __name__ == '__main__':
+    main()
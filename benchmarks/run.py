@@ -0,0 +1,235 @@
+"""Benchmark suite for the jsontree encode, decode and access hot paths.
+
+Runs loads, dumps, clone, attribute reads and mapped class reads over a
+set of synthetic corpora (wide, deep, timestamp heavy, string heavy and
+NDJSON), recording throughput, latency percentiles and the tracemalloc
+peak of each case. The results are written as JSON, and can be compared
+against a stored baseline, flagging cases whose median latency regressed
+by more than the threshold:
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json
+    python benchmarks/run.py --only timestamps --save-baseline
+
+Timings are only comparable on the same machine and interpreter, so
+refresh the baseline with --save-baseline before comparing branches.
+"""
+import argparse
+import datetime
+import fnmatch
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import jsontree
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+NOW = datetime.datetime(2013, 4, 29, 22, 45, 35, 294303)
+
+
+def wide(scale):
+    # Records with many short fields, the shape of API list responses.
+    return [dict(('field_%02d' % j, j * i if j % 3 else 'value %d' % j)
+                 for j in range(60))
+            for i in range(400 * scale)]
+
+
+def deep(scale):
+    def node(depth, i):
+        if not depth:
+            return {'leaf': i, 'name': 'leaf %d' % i}
+        return {'level': depth, 'child': node(depth - 1, i), 'tags': [depth]}
+    return [node(60, i) for i in range(60 * scale)]
+
+
+def timestamps(scale):
+    return [{
+        'id': i,
+        'created_at': (NOW + datetime.timedelta(seconds=i)).isoformat(),
+        'updated_at': (NOW + datetime.timedelta(minutes=i)).isoformat(),
+        'events': [(NOW + datetime.timedelta(hours=j)).isoformat()
+                   for j in range(5)],
+    } for i in range(2000 * scale)]
+
+
+def strings(scale):
+    text = u'Lorem ipsum dolor sit amet, élève "quoted" \\ %d\n'
+    return [{'id': i, 'title': (text % i)[:40], 'body': (text % i) * 8,
+             'status': ['open', 'closed'][i % 2]}
+            for i in range(1500 * scale)]
+
+
+def make_corpora(scale):
+    corpora = {}
+    for name, build in [('wide', wide), ('deep', deep),
+                        ('timestamps', timestamps), ('strings', strings)]:
+        corpora[name] = json.dumps(build(scale))
+    corpora['ndjson'] = '\n'.join(json.dumps(record) for record
+                                  in timestamps(scale) + strings(scale))
+    return corpora
+
+
+def ndjson_loads(doc):
+    return list(jsontree.iterload(io.StringIO(doc)))
+
+
+def ndjson_dumps(records):
+    out = io.StringIO()
+    jsontree.dump_lines(records, out)
+    return out.getvalue()
+
+
+def read_attributes(tree):
+    # Touch every string keyed member of every record through attributes.
+    def read():
+        for record in tree:
+            for key in record:
+                getattr(record, key)
+    return read
+
+
+def read_mapped(doc):
+    # Read camelCase names through a mapped class over snake_case keys.
+    def camel(name):
+        head, _, tail = name.partition('_')
+        return head + tail.title().replace('_', '')
+    records = jsontree.loads(doc)
+    mapping = dict((camel(key), key) for record in records[:1]
+                   for key in record)
+    cls = jsontree.mapped_jsontree_class(mapping)
+    tree = jsontree.loads(doc, jsontreecls=cls)
+    names = list(mapping)
+    def read():
+        for record in tree:
+            for name in names:
+                getattr(record, name)
+    return read
+
+
+def make_cases(corpora):
+    """Yield (name, size in bytes, function) for every benchmark case."""
+    for corpus, doc in sorted(corpora.items()):
+        size = len(doc.encode('utf-8'))
+        if corpus == 'ndjson':
+            tree = ndjson_loads(doc)
+            yield corpus + '/loads', size, lambda doc=doc: ndjson_loads(doc)
+            yield corpus + '/dumps', size, lambda tree=tree: ndjson_dumps(tree)
+            continue
+        tree = jsontree.loads(doc)
+        yield corpus + '/loads', size, lambda doc=doc: jsontree.loads(doc)
+        yield corpus + '/dumps', size, lambda tree=tree: jsontree.dumps(tree)
+        yield corpus + '/clone', size, lambda tree=tree: jsontree.clone(tree)
+        if corpus in ('wide', 'timestamps'):
+            yield corpus + '/attributes', size, read_attributes(tree)
+            yield corpus + '/mapped', size, read_mapped(doc)
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def measure(func, size, repeat):
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    median = percentile(samples, 0.5)
+    return {
+        'mb_per_s': round(size / median / 1e6, 3),
+        'p50_ms': round(median * 1e3, 3),
+        'p90_ms': round(percentile(samples, 0.9) * 1e3, 3),
+        'p99_ms': round(percentile(samples, 0.99) * 1e3, 3),
+        'peak_mb': round(peak / 1e6, 3),
+    }
+
+
+def run(scale, repeat, only):
+    results = {}
+    for name, size, func in make_cases(make_corpora(scale)):
+        if only and not any(fnmatch.fnmatch(name, pattern) or
+                            name.startswith(pattern + '/')
+                            for pattern in only):
+            continue
+        results[name] = measure(func, size, repeat)
+        print('%-24s %9.1f MB/s  p50 %9.3f ms  p99 %9.3f ms  peak %8.1f MB'
+              % ((name,) + tuple(results[name][key] for key in
+                                 ('mb_per_s', 'p50_ms', 'p99_ms',
+                                  'peak_mb'))), file=sys.stderr)
+    return {
+        'jsontree': jsontree.__version_string__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'scale': scale,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print the p50 ratio of every case in both runs and return the names
+    of the cases slower than the baseline by more than threshold.
+    """
+    regressions = []
+    print('%-24s %12s %12s %8s' % ('case', 'baseline ms', 'current ms',
+                                   'ratio'))
+    for name, result in sorted(current['results'].items()):
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        ratio = result['p50_ms'] / before['p50_ms']
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('%-24s %12.3f %12.3f %7.2fx%s' % (
+            name, before['p50_ms'], result['p50_ms'], ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', type=int, default=1,
+                        help='corpus size multiplier')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='timed runs per case')
+    parser.add_argument('--only', action='append', default=[],
+                        help='corpus name or case pattern, e.g. "*/loads"')
+    parser.add_argument('--output', help='write the results JSON here')
+    parser.add_argument('--baseline', help='compare against this results JSON')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write the results to %s' % BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='allowed p50 slowdown before failing')
+    args = parser.parse_args(argv)
+    current = run(args.scale, args.repeat, args.only)
+    text = json.dumps(current, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            fp.write(text + '\n')
+    if args.save_baseline:
+        with open(BASELINE, 'w') as fp:
+            fp.write(text + '\n')
+    if not (args.output or args.save_baseline or args.baseline):
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        if compare(current, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,22 @@
 """JSON Tree Library
 
 """
+import array
+import codecs
 import collections
 import datetime
+import decimal
+import fnmatch
+import itertools
 import json
 import json.scanner
+import mmap
+import operator
+import os
 import re
+import struct
 import sys
+import time
 
 __version__ = (0,5,1)
 __version_string__ = '.'.join(str(x) for x in __version__)
@@ -18,6 +28,11 @@ __email__ = 'doug.napoleone+jsontree@gmail.com'
 if sys.version_info.major > 2 :
     basestring = str
 
+try:
+    import collections.abc as collections_abc
+except ImportError:
+    collections_abc = collections
+
 # ISO/UTC date examples:
 #    2013-04-29T22:45:35.294303Z
 #    2013-04-29T22:45:35.294303
@@ -35,6 +50,7 @@ _z = '%z'
 
 class _FixedTzOffset(datetime.tzinfo):
     def __init__(self, offset_str):
+        self.__offset_str = offset_str
         hours = int(offset_str[1:3], 10)
         mins = int(offset_str[-2:], 10)
         if offset_str[0] == '-':
@@ -46,6 +62,10 @@ class _FixedTzOffset(datetime.tzinfo):
                                         minutes=mins)
         self.__name = ''
 
+    def __getinitargs__(self):
+        # tzinfo.__reduce__ passes these back to __init__ when unpickling.
+        return (self.__offset_str,)
+
     def utcoffset(self, dt):
         return self.__offset
 
@@ -55,24 +75,108 @@ class _FixedTzOffset(datetime.tzinfo):
     def dst(self, dt):
         return self.__dst
 
+_utc = getattr(datetime, 'timezone', None) and datetime.timezone.utc
+_zero = datetime.timedelta(0)
+_tzinfo_cache = {}
+_tzinfo_cache_size = 256
+
+def _tzinfo(offset_str):
+    """Return the shared tzinfo for an ISO offset string ('-0400', '+04:00').
+    
+    Every distinct offset string maps to a single tzinfo instance, and zero
+    offsets map to datetime.timezone.utc where it exists. The cache is
+    bounded, and is simply emptied when full.
+    
+    >>> _tzinfo('-04:00') is _tzinfo('-04:00')
+    True
+    >>> _tzinfo('+0000') is _tzinfo('-00:00') is datetime.timezone.utc
+    True
+    """
+    try:
+        return _tzinfo_cache[offset_str]
+    except KeyError:
+        pass
+    tz = _FixedTzOffset(offset_str)
+    if _utc is not None and tz.utcoffset(None) == _zero:
+        tz = _utc
+    if len(_tzinfo_cache) >= _tzinfo_cache_size:
+        _tzinfo_cache.clear()
+    _tzinfo_cache[offset_str] = tz
+    return tz
+
 def _datetimedecoder(dtstr):
+    # Positional pre-filter: ordinary strings are rejected on length and the
+    # date/time separators before the regular expression is ever run.
+    if (len(dtstr) < 19 or dtstr[4] != '-' or dtstr[7] != '-' or
+            dtstr[13] != ':' or dtstr[16] != ':'):
+        return dtstr
     match = _datetime_iso_re.match(dtstr)
-    if match:
-        gd = match.groupdict()
-        T = gd['T']
-        strptime = _date + T + _time
-        if gd['f']:
-            strptime += '.%f'
-        if gd['Z']:
-            strptime += 'Z'
+    if not match:
+        return dtstr
+    f, z, Z = match.group('f', 'z', 'Z')
+    # Mirror the strptime formats this replaced: at most 6 fraction digits,
+    # and a trailing 'Z' is not accepted.
+    if Z or (f and len(f) > 7):
+        return dtstr
+    try:
+        result = datetime.datetime(
+            int(dtstr[0:4]), int(dtstr[5:7]), int(dtstr[8:10]),
+            int(dtstr[11:13]), int(dtstr[14:16]), int(dtstr[17:19]),
+            int(f[1:].ljust(6, '0')) if f else 0)
+    except ValueError:
+        return dtstr
+    if z:
+        result = result.replace(tzinfo=_tzinfo(z))
+    return result
+
+def _datetimekey_matcher(datetimekeys):
+    """Build the key predicate used by JSONTreeDecoder's datetimekeys option
+    from a callable, a key name, or an iterable of key names and fnmatch
+    style patterns. Results are memoized per key name.
+    """
+    if callable(datetimekeys):
+        return datetimekeys
+    if isinstance(datetimekeys, basestring):
+        datetimekeys = [datetimekeys]
+    names = set()
+    patterns = []
+    for key in datetimekeys:
+        if any(c in key for c in '*?['):
+            patterns.append(fnmatch.translate(key))
+        else:
+            names.add(key)
+    if not patterns:
+        return names.__contains__
+    pattern = re.compile('|'.join(patterns)).match
+    cache = {}
+    def datetimekey(key):
         try:
-            result = datetime.datetime.strptime(gd['parsable'], strptime)
-            if gd['z']:
-                result = result.replace(tzinfo=_FixedTzOffset(gd['z']))
-            return result
-        except ValueError:
-            return dtstr
-    return dtstr
+            return cache[key]
+        except KeyError:
+            pass
+        result = key in names or pattern(key) is not None
+        if len(cache) < 4096:
+            cache[key] = result
+        return result
+    return datetimekey
+
+_intern_size = 65536
+_intern_length = 64
+
+def _interning(func, table):
+    # Cache func (or the identity) over short strings, so equal strings
+    # share a single result. The table stops growing at _intern_size
+    # entries, which keeps high cardinality values from filling it.
+    def interning(value):
+        try:
+            return table[value]
+        except KeyError:
+            pass
+        result = value if func is None else func(value)
+        if len(value) <= _intern_length and len(table) < _intern_size:
+            table[value] = result
+        return result
+    return interning
 
 def _datetimeencoder(dtobj):
     return dtobj.isoformat()
@@ -86,19 +190,64 @@ class jsontree(collections.defaultdict):
     >>> mytree.something.there = 3
     >>> mytree['something']['there'] == 3
     True
+    
+    Methods take precedence over keys of the same name:
+    
+    >>> mytree.keys = 'value'
+    >>> mytree['keys'], list(mytree.keys())
+    ('value', ['something', 'keys'])
+    
+    Trees can be pickled:
+    
+    >>> import pickle
+    >>> pickle.loads(pickle.dumps(mytree)) == mytree
+    True
+    >>> stamped = loads('{"at": "2013-04-29T22:45:35-04:00"}')
+    >>> pickle.loads(pickle.dumps(stamped)).at.isoformat()
+    '2013-04-29T22:45:35-04:00'
     """
     def __init__(self, *args, **kwdargs):
         super(jsontree, self).__init__(jsontree, *args, **kwdargs)
         
-    def __getattribute__(self, name):
-        try:
-            return object.__getattribute__(self, name)
-        except AttributeError:
-            return self[name]
+    # Only called when normal attribute lookup fails, so methods such as
+    # keys still win over keys of the same name without paying for an
+    # exception on every data key access. dict's __getitem__ still calls
+    # __missing__ for the auto-vivification.
+    __getattr__ = collections.defaultdict.__getitem__
+    __setattr__ = collections.defaultdict.__setitem__
     
-    def __setattr__(self, name, value):
-        self[name] = value
-        return value
+    def __reduce__(self):
+        # defaultdict would pass the default_factory back to __init__.
+        return self.__class__, (), None, None, iter(self.items())
+
+_mapped_class_cache = {}
+_mapped_class_cache_size = 256
+
+def _memoized_translation(mapper, size=1024):
+    # Memoize an attribute name mapping callable in a bounded table.
+    cache = {}
+    def translate(name):
+        try:
+            return cache[name]
+        except KeyError:
+            pass
+        if name[:2] == '__' and name[-2:] == '__':
+            # Special names (pickle and copy look up __reduce_ex__ on the
+            # instance) are never mapped.
+            mapped_name = name
+        else:
+            mapped_name = mapper(name)
+        if len(cache) < size:
+            cache[name] = mapped_name
+        return mapped_name
+    return translate
+
+def _hashable(table):
+    try:
+        hash(tuple(table.values()))
+    except TypeError:
+        return False
+    return True
 
 def mapped_jsontree_class(mapping):
     """Return a class which is a jsontree, but with a supplied attribute name
@@ -154,18 +303,56 @@ def mapped_jsontree_class(mapping):
     >>> repr(dict(loaded_number)).replace('u', '') # cheat the python2 tests
     "{'1': 'something'}"
     
+    Classes are cached, by identity for callables and by content for
+    mappings (which are copied when the class is created), so repeated calls
+    return the same class. Translations from a callable are memoized per
+    attribute name, so the callable must always return the same name:
+    
+    >>> mapped_jsontree_class(dict(one='1')) is mapped_jsontree_class({'one': '1'})
+    True
+    >>> mapped_jsontree_class(spacify) is spacemapped
+    True
+    
+    The translated name is looked up as an attribute first and then as a
+    key, so mapping a method name reads the key instead, while names mapped
+    to non-string keys always read the key:
+    
+    >>> renamed = mapped_jsontree_class({'keys': 'k'})(k=[1, 2])
+    >>> renamed.keys
+    [1, 2]
+    >>> numbered = mapped_jsontree_class({'one': 1})
+    >>> flagged = mapped_jsontree_class({'one': True})()
+    >>> flagged.one = 'v'
+    >>> list(flagged.keys())
+    [True]
     """
-    mapper = mapping
-    if not callable(mapping):
-        if not isinstance(mapping, collections.Mapping):
+    if callable(mapping):
+        cache_key = mapping
+        translate = _memoized_translation(mapping)
+    else:
+        if not isinstance(mapping, collections_abc.Mapping):
             raise TypeError("Argument mapping is not collable or an instance "
                               "of collections.Mapping")
-        mapper = lambda name: mapping.get(name, name)
+        # Later changes to the caller's mapping must not affect the class.
+        mapping = table = dict(mapping)
+        # The value types keep equal keys of other types (1, True and 1.0)
+        # from sharing a class.
+        cache_key = (frozenset((name, type(key), key)
+                               for name, key in table.items())
+                     if _hashable(table) else None)
+        translate = lambda name: table.get(name, name)
+    try:
+        return _mapped_class_cache[cache_key]
+    except KeyError:
+        pass
+    except TypeError:
+        # Unhashable callables are simply not cached.
+        cache_key = None
     class mapped_jsontree(collections.defaultdict):
         def __init__(self, *args, **kwdargs):
             super(mapped_jsontree, self).__init__(mapped_jsontree, *args, **kwdargs)
         def __getattribute__(self, name):
-            mapped_name = mapper(name)
+            mapped_name = translate(name)
             if not isinstance(mapped_name, basestring):
                 return self[mapped_name]
             try:
@@ -173,11 +360,22 @@ def mapped_jsontree_class(mapping):
             except AttributeError:
                 return self[mapped_name]
         def __setattr__(self, name, value):
-            mapped_name = mapper(name)
-            self[mapped_name] = value
-            return value
+            self[translate(name)] = value
+        def __reduce__(self):
+            return (_new_mapped_jsontree, (mapping,), None, None,
+                    iter(self.items()))
+    # Kept so the class can be re-created in another process.
+    mapped_jsontree._jsontree_mapping = mapping
+    if cache_key is not None:
+        if len(_mapped_class_cache) >= _mapped_class_cache_size:
+            _mapped_class_cache.clear()
+        _mapped_class_cache[cache_key] = mapped_jsontree
     return mapped_jsontree
 
+def _new_mapped_jsontree(mapping):
+    # Unpickling helper, module level so pickle can find it.
+    return mapped_jsontree_class(mapping)()
+
 def mapped_jsontree(mapping, *args, **kwdargs):
     """Helper function that calls mapped_jsontree_class, and passing the
     rest of the arguments to the constructor of the new class.
@@ -192,79 +390,1814 @@ def mapped_jsontree(mapping, *args, **kwdargs):
     """
     return mapped_jsontree_class(mapping)(*args, **kwdargs)
     
+class frozenjsontree(collections_abc.Mapping):
+    """Immutable, hashable and compact read-only version of a jsontree.
+    
+    Each recurring key set (shape) gets its own class with one __slots__
+    entry per key, so a record holds just its values with no per-instance
+    dict; a shape seen only once, or any new shape once a bounded number of
+    classes exist, keeps its values in a dict instead. Keys can still be
+    read as attributes, methods win over keys of the same name, and missing
+    keys raise instead of auto-vivifying. Use freeze to build one, or
+    loads(..., frozen=True):
+    
+    >>> record = frozenjsontree({'id': 7, 'tags': ['a', 'b'], 'meta': {'ok': True}})
+    >>> record.id, record.tags, record.meta.ok
+    (7, ('a', 'b'), True)
+    >>> record['id']
+    7
+    >>> record == {'id': 7, 'tags': ('a', 'b'), 'meta': {'ok': True}}
+    True
+    >>> len(set([record, freeze(jsontree(id=7, tags=['a', 'b'], meta={'ok': True}))]))
+    1
+    >>> record.id = 8
+    Traceback (most recent call last):
+        ...
+    AttributeError: frozenjsontree is immutable
+    """
+    __slots__ = ()
+    _keys = ()
+    _lookup = {}
+    
+    def __new__(cls, *args, **kwdargs):
+        return freeze(dict(*args, **kwdargs))
+    
+    def _values(self):
+        return self._getter(self)
+    
+    def __getitem__(self, key):
+        return self._lookup[key].__get__(self)
+    
+    def __iter__(self):
+        return iter(self._keys)
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def __contains__(self, key):
+        return key in self._lookup
+    
+    def __getattr__(self, name):
+        try:
+            return self._lookup[name].__get__(self)
+        except KeyError:
+            raise AttributeError(name)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("frozenjsontree is immutable")
+    
+    def __delattr__(self, name):
+        raise AttributeError("frozenjsontree is immutable")
+    
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self._values() == other._values()
+        return super(frozenjsontree, self).__eq__(other)
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __hash__(self):
+        return hash(frozenset(zip(self._keys, self._values())))
+    
+    def __reduce__(self):
+        return _frozen_record, (self._keys, self._values())
+    
+    def __repr__(self):
+        return 'frozenjsontree(%r)' % dict(zip(self._keys, self._values()))
+
+class _frozendictrecord(frozenjsontree):
+    # Record for a shape without a class of its own: a shape seen only
+    # once, or any new shape once the class cache is full. The values are
+    # held in a private dict instead of per-key slots.
+    __slots__ = ('_frozen_data',)
+    
+    @property
+    def _keys(self):
+        return tuple(self._frozen_data)
+    
+    def _values(self):
+        return tuple(self._frozen_data.values())
+    
+    def __getitem__(self, key):
+        return self._frozen_data[key]
+    
+    def __iter__(self):
+        return iter(self._frozen_data)
+    
+    def __len__(self):
+        return len(self._frozen_data)
+    
+    def __contains__(self, key):
+        return key in self._frozen_data
+    
+    def __getattr__(self, name):
+        try:
+            return self._frozen_data[name]
+        except KeyError:
+            raise AttributeError(name)
+    
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self._frozen_data == other._frozen_data
+        return collections_abc.Mapping.__eq__(self, other)
+    
+    __hash__ = frozenjsontree.__hash__
+
+_set_frozen_data = _frozendictrecord._frozen_data.__set__
+
+_frozen_classes = {}
+_frozen_shapes = set()
+_frozen_class_cache_size = 1024
+
+def _frozen_class(keys):
+    # Return the per-shape frozenjsontree class for a tuple of keys, or None
+    # if the record should be dict backed instead: the keys repeat, this is
+    # the first time the shape is seen, or the class cache is full.
+    try:
+        return _frozen_classes[keys]
+    except KeyError:
+        pass
+    if keys not in _frozen_shapes:
+        if len(_frozen_shapes) >= _frozen_class_cache_size:
+            _frozen_shapes.clear()
+        _frozen_shapes.add(keys)
+        return None
+    if (len(set(keys)) != len(keys) or
+            len(_frozen_classes) >= _frozen_class_cache_size):
+        return None
+    slots = tuple('_frozen_%d' % i for i in range(len(keys)))
+    cls = type('frozenjsontree', (frozenjsontree,),
+               {'__slots__': slots, '_keys': keys, '__module__': __name__})
+    members = [cls.__dict__[slot] for slot in slots]
+    type.__setattr__(cls, '_lookup', dict(zip(keys, members)))
+    type.__setattr__(cls, '_setters',
+                     tuple(member.__set__ for member in members))
+    if len(slots) > 1:
+        getter = operator.attrgetter(*slots)
+    elif slots:
+        getter = lambda record, get=operator.attrgetter(slots[0]): (
+            get(record),)
+    else:
+        getter = lambda record: ()
+    type.__setattr__(cls, '_getter', staticmethod(getter))
+    for key, member in zip(keys, members):
+        # Alias the slot under the key name for fast attribute reads,
+        # unless that would hide a method or another slot.
+        if (isinstance(key, basestring) and not hasattr(cls, key)):
+            type.__setattr__(cls, key, member)
+    _frozen_shapes.discard(keys)
+    _frozen_classes[keys] = cls
+    return cls
+
+def _frozen_record(keys, values):
+    cls = _frozen_class(keys)
+    if cls is None:
+        record = object.__new__(_frozendictrecord)
+        _set_frozen_data(record, dict(zip(keys, values)))
+        return record
+    record = object.__new__(cls)
+    for setter, value in zip(cls._setters, values):
+        setter(record, value)
+    return record
+
+def _frozen_from_pairs(pairs):
+    # jsontreecls replacement used by JSONTreeDecoder(frozen=True): values
+    # are already decoded, only lists still need to become tuples.
+    if isinstance(pairs, collections_abc.Mapping):
+        pairs = pairs.items()
+    keys = []
+    values = []
+    for key, value in pairs:
+        keys.append(key)
+        values.append(freeze(value) if isinstance(value, list) else value)
+    return _frozen_record(tuple(keys), values)
+
+def freeze(root):
+    """Return an immutable, hashable copy of a tree: mappings become
+    frozenjsontree records and lists become tuples. Leaf values and
+    already frozen records are shared.
+    
+    >>> tree = jsontree()
+    >>> tree.server.ports = [80, 443]
+    >>> frozen = freeze(tree)
+    >>> frozen.server.ports
+    (80, 443)
+    >>> frozen == tree
+    False
+    >>> dumps(frozen) == dumps(tree)
+    True
+    """
+    def _freeze(obj):
+        if isinstance(obj, frozenjsontree):
+            return obj
+        if isinstance(obj, dict):
+            keys = []
+            values = []
+            for key, value in obj.items():
+                keys.append(key)
+                values.append(_freeze(value))
+            return _frozen_record(tuple(keys), values)
+        if isinstance(obj, collections_abc.Mapping):
+            return _freeze(dict(obj))
+        if isinstance(obj, (list, tuple)):
+            return tuple(_freeze(value) for value in obj)
+        return obj
+    return _freeze(root)
+    
+_timer = getattr(time, 'perf_counter', time.time)
+
+class jsontreestats(object):
+    """Counters filled in by JSONTreeDecoder and JSONTreeEncoder when they
+    are given stats=..., which loads, load, dumps, dump and the streaming
+    functions pass through.
+    
+    Pass a jsontreestats instance to accumulate the counts of every call,
+    or any other callable to have it called with a new jsontreestats after
+    each document, for example to export them to a metrics system:
+    
+    >>> stats = jsontreestats()
+    >>> tree = loads('{"at": "2013-04-29T22:45:35", "tags": ["a", "b"]}',
+    ...              stats=stats)
+    >>> stats.objects, stats.arrays, stats.strings, stats.datetimes
+    (1, 1, 3, 1)
+    >>> reports = []
+    >>> text = dumps(tree, stats=reports.append)
+    >>> reports[0].calls, reports[0].bytes == len(text)
+    (1, True)
+    
+    The streaming loaders report once per value they produce:
+    
+    >>> import io
+    >>> stats = jsontreestats()
+    >>> fp = io.StringIO(u'[1234567, "caf\\u00e9"]')
+    >>> len(list(iterload_array(fp, chunk_size=4, stats=stats)))
+    2
+    >>> stats.calls, stats.bytes
+    (2, 14)
+    
+    Interned strings that are repeated are not counted as datetimes:
+    
+    >>> stats = jsontreestats()
+    >>> doc = '[{"s": "open"}, {"s": "open"}, {"s": "2013-04-29 22:45:35"}]'
+    >>> tree = loads(doc, intern=True, stats=stats)
+    >>> stats.datetime_candidates, stats.datetimes
+    (3, 1)
+    
+    bytes is the utf-8 encoded size of the JSON text read or written, and
+    strings includes the datetime values. datetime_candidates counts
+    the strings (or datetimes, when encoding) passed to the datetime
+    decoder (or encoder), datetimes the values it converted, and
+    datetime_seconds the time spent in it. Lazily decoded objects are
+    counted without their members.
+    """
+    __slots__ = ('calls', 'objects', 'arrays', 'strings',
+                 'datetime_candidates', 'datetimes', 'datetime_seconds',
+                 'bytes', 'seconds')
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+    def as_dict(self):
+        """Return the counters as a dictionary."""
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+    def _add(self, other):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+    def _take(self):
+        taken = jsontreestats()
+        taken._add(self)
+        self.__init__()
+        return taken
+    def _count(self, obj):
+        # Walk a decoded or to be encoded structure counting the nodes,
+        # without expanding lazily decoded objects.
+        objects = arrays = strings = 0
+        stack = [obj]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, (basestring, datetime.datetime)):
+                strings += 1
+            elif isinstance(obj, dict):
+                objects += 1
+                if not isinstance(obj, _lazyjsontree):
+                    stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple)):
+                arrays += 1
+                stack.extend(obj)
+            elif isinstance(obj, frozenjsontree):
+                objects += 1
+                stack.extend(obj._values())
+        self.objects += objects
+        self.arrays += arrays
+        self.strings += strings
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(
+            '%s=%r' % (name, getattr(self, name)) for name in self.__slots__))
+
+def _counting(func, counts):
+    # Wrap the datetime decoder or encoder to count and time its calls.
+    def counting(value):
+        start = _timer()
+        result = func(value)
+        counts.datetime_seconds += _timer() - start
+        counts.datetime_candidates += 1
+        # Not an identity test, as interning may return an equal string.
+        if type(result) is not type(value):
+            counts.datetimes += 1
+        return result
+    return counting
+
+if hasattr(str, 'isascii'):
+    _isascii = str.isascii
+else:
+    def _isascii(text):
+        return re.search(u'[^\x00-\x7f]', text) is None
+
+def _utf8_size(text, start=0, end=None):
+    # The utf-8 encoded size of text[start:end], without encoding it when
+    # it is ASCII.
+    if start or (end is not None and end != len(text)):
+        text = text[start:end]
+    if isinstance(text, bytes) or _isascii(text):
+        return len(text)
+    return len(text.encode('utf-8', 'surrogatepass'))
+
+def _report_stats(stats, counts, obj, size, seconds):
+    counts._count(obj)
+    counts.calls += 1
+    counts.bytes += size
+    counts.seconds += seconds
+    if isinstance(stats, jsontreestats):
+        stats._add(counts._take())
+    else:
+        stats(counts._take())
+
+def _frozenencoder(obj):
+    return dict(zip(obj._keys, obj._values()))
+
+def _encoder_table(datetimeencoder, encoders):
+    # Encoders for the values the json encoders do not handle themselves,
+    # found by exact type with a single dictionary lookup; subclasses
+    # (every frozenjsontree record class is one) are added by
+    # _encoder_resolve.
+    if datetimeencoder is _datetimeencoder:
+        # The same result without a python call per datetime.
+        datetimeencoder = datetime.datetime.isoformat
+    table = collections.OrderedDict([
+        (datetime.datetime, datetimeencoder),
+        (datetime.date, datetime.date.isoformat),
+        (datetime.time, datetime.time.isoformat),
+        (datetime.timedelta, datetime.timedelta.total_seconds),
+        (decimal.Decimal, str),
+        (frozenjsontree, _frozenencoder)])
+    if encoders:
+        table.update(encoders)
+    return table
+
+def _encoder_resolve(table, cls):
+    for base, encoder in list(table.items()):
+        if issubclass(cls, base):
+            table[cls] = encoder
+            return encoder
+    return None
+
 class JSONTreeEncoder(json.JSONEncoder):
     """JSON encoder class that serializes out jsontree object structures and
     datetime objects into ISO strings.
+    
+    date and time objects are also written as ISO strings, timedelta as
+    its total seconds and Decimal as a string (to keep every digit). The
+    encoders argument maps further types, or any of these, to a function
+    returning a JSON serializable value. They are all found with a single
+    lookup by type, and converted without leaving the C encoder:
+    
+    >>> dumps([datetime.date(2013, 4, 29), datetime.timedelta(minutes=1),
+    ...        decimal.Decimal('0.10')])
+    '["2013-04-29", 60.0, "0.10"]'
+    >>> dumps(decimal.Decimal('0.10'), encoders={decimal.Decimal: float})
+    '0.1'
     """
     def __init__(self, *args, **kwdargs):
         datetimeencoder = _datetimeencoder
+        encoders = None
         if 'datetimeencoder' in kwdargs:
             datetimeencoder = kwdargs.pop('datetimeencoder')
+        if 'encoders' in kwdargs:
+            encoders = kwdargs.pop('encoders')
+        self.__stats = kwdargs.pop('stats', None)
+        if self.__stats is not None:
+            self.__counts = jsontreestats()
+            datetimeencoder = _counting(datetimeencoder, self.__counts)
+            self.iterencode = self._stats_iterencode
         super(JSONTreeEncoder, self).__init__(*args, **kwdargs)
-        self.__datetimeencoder = datetimeencoder
+        self.__encoders = _encoder_table(datetimeencoder, encoders)
     def default(self, obj):
-        if isinstance(obj, datetime.datetime):
-            return self.__datetimeencoder(obj)
-        else:
-            return super(JSONTreeEncoder, self).default(obj)
+        encoder = self.__encoders.get(obj.__class__)
+        if encoder is None:
+            encoder = _encoder_resolve(self.__encoders, obj.__class__)
+            if encoder is None:
+                return super(JSONTreeEncoder, self).default(obj)
+        return encoder(obj)
+    def _stats_iterencode(self, o, *args, **kwdargs):
+        # Time the encoding, but not whatever consumes the chunks.
+        size = 0
+        seconds = 0.0
+        start = _timer()
+        for chunk in super(JSONTreeEncoder, self).iterencode(o, *args,
+                                                             **kwdargs):
+            seconds += _timer() - start
+            size += _utf8_size(chunk)
+            yield chunk
+            start = _timer()
+        seconds += _timer() - start
+        _report_stats(self.__stats, self.__counts, o, size, seconds)
 
 class JSONTreeDecoder(json.JSONDecoder):
     """JSON decoder class for deserializing to a jsontree object structure
     and building datetime objects from strings with the ISO datetime format.
+    
+    When the C accelerated scanner is available (and no object_hook or
+    object_pairs_hook was supplied) the decoder keeps the C scanner, building
+    the jsontree nodes through object_pairs_hook and running the datetime
+    decoder over the string values as a post-pass. Pass accelerate=False to
+    force the pure python scanner. Both paths produce the same result:
+    
+    >>> doc = '{"a": ["2013-04-29T22:45:35", [1, "x"]], "b": {"c": "y"}}'
+    >>> fast = loads(doc)
+    >>> slow = loads(doc, accelerate=False)
+    >>> fast == slow
+    True
+    >>> fast.a[0]
+    datetime.datetime(2013, 4, 29, 22, 45, 35)
+    >>> type(fast.b).__name__
+    'jsontree'
+    
+    The datetimekeys argument limits datetime conversion to the values of
+    the given keys (and strings in arrays under those keys). It takes key
+    names, fnmatch style patterns, or a callable taking the key name:
+    
+    >>> doc = '{"created_at": "2013-04-29 22:45:35", "note": "2013-04-29 22:45:35"}'
+    >>> tree = loads(doc, datetimekeys=['*_at', 'updated'])
+    >>> tree.created_at
+    datetime.datetime(2013, 4, 29, 22, 45, 35)
+    >>> tree.note
+    '2013-04-29 22:45:35'
+    
+    With frozen=True the result is built from frozenjsontree records and
+    tuples instead of jsontree nodes and lists (jsontreecls is ignored):
+    
+    >>> loads('[{"id": 1, "tags": ["a"]}]', frozen=True)
+    (frozenjsontree({'id': 1, 'tags': ('a',)}),)
+    
+    With lazy=True an object is held as an offset into the document until
+    it is first used, when its members are decoded and it becomes a plain
+    jsontreecls node; nested objects are only skipped over at that point.
+    Syntax errors may therefore only be reported when the object containing
+    them is first used (and again on every later use):
+    
+    >>> tree = loads('{"meta": {"status": "ok"}, "data": {"rows": [1, 2]}}', lazy=True)
+    >>> tree.meta.status
+    'ok'
+    >>> type(tree.meta).__name__, type(dict.__getitem__(tree, 'data')).__name__
+    ('jsontree', '_lazyjsontree')
+    >>> tree == loads('{"meta": {"status": "ok"}, "data": {"rows": [1, 2]}}')
+    True
+    >>> tree = loads('{"id": 1}}', lazy=True)
+    >>> for attempt in range(2):
+    ...     try:
+    ...         tree.id
+    ...     except ValueError as err:
+    ...         print(err)
+    Extra data: line 1 column 10 (char 9)
+    Extra data: line 1 column 10 (char 9)
+    
+    With intern=True equal short strings share a single object across the
+    decode (keys are interned with sys.intern), and each distinct datetime
+    string is only parsed once, which saves memory and time on documents
+    with many repeated values:
+    
+    >>> row = '{"status": "open", "at": "2013-04-29 22:45:35"}'
+    >>> rows = loads('[%s, %s]' % (row, row), intern=True)
+    >>> rows[0].status is rows[1].status, rows[0].at is rows[1].at
+    (True, True)
     """
     def __init__(self, *args, **kwdargs):
         jsontreecls = jsontree
         datetimedecoder = _datetimedecoder
+        datetimekeys = None
+        accelerate = True
         if 'jsontreecls' in kwdargs:
             jsontreecls = kwdargs.pop('jsontreecls')
         if 'datetimedecoder' in kwdargs:
             datetimedecoder = kwdargs.pop('datetimedecoder')
+        if 'datetimekeys' in kwdargs:
+            datetimekeys = kwdargs.pop('datetimekeys')
+        if 'accelerate' in kwdargs:
+            accelerate = kwdargs.pop('accelerate')
+        self.__frozen = kwdargs.pop('frozen', False)
+        self.__lazy = kwdargs.pop('lazy', False)
+        self.__stats = kwdargs.pop('stats', None)
+        self.__share = None
+        if kwdargs.pop('intern', False):
+            # Equal short strings share one object, and datetime strings
+            # are only parsed the first time they are seen.
+            datetimedecoder = _interning(datetimedecoder, {})
+            self.__share = _interning(None, {})
+            self.__intern_key = getattr(sys, 'intern', self.__share)
+        if self.__stats is not None:
+            self.__counts = jsontreestats()
+            self.raw_decode = self._stats_raw_decode
+            if not self.__lazy:
+                # Lazily decoded values are converted after the call has
+                # been reported, so they are not counted.
+                datetimedecoder = _counting(datetimedecoder, self.__counts)
+        if self.__frozen:
+            if self.__lazy:
+                raise ValueError("frozen and lazy can not be combined")
+            jsontreecls = _frozen_from_pairs
         super(JSONTreeDecoder, self).__init__(*args, **kwdargs)
-        self.__parse_object = self.parse_object
-        self.__parse_string = self.parse_string
-        self.parse_object = self._parse_object
-        self.parse_string = self._parse_string
-        self.scan_once = json.scanner.py_make_scanner(self)
         self.__jsontreecls = jsontreecls
         self.__datetimedecoder = datetimedecoder
+        self.__datetimekey = None
+        if datetimekeys is not None:
+            self.__datetimekey = _datetimekey_matcher(datetimekeys)
+        if self.__lazy:
+            if self.object_hook is not None or self.object_pairs_hook is not None:
+                raise ValueError("lazy can not be combined with object_hook "
+                                 "or object_pairs_hook")
+            # Scalars are decoded, and objects skipped, with the untouched
+            # base scanner; objects and arrays are built by _LazyLoader.
+            self.__accelerated = False
+            return
+        self.__accelerated = bool(accelerate
+                                  and json.scanner.c_make_scanner is not None
+                                  and self.object_hook is None
+                                  and self.object_pairs_hook is None)
+        if self.__accelerated:
+            if self.__share is None:
+                self.object_pairs_hook = self._object_pairs_hook
+            else:
+                self.object_pairs_hook = self._interning_pairs_hook
+            self.scan_once = json.scanner.c_make_scanner(self)
+        else:
+            self.__parse_object = self.parse_object
+            self.__parse_string = self.parse_string
+            self.parse_object = self._parse_object
+            if self.__datetimekey is None:
+                self.parse_string = self._parse_string
+            self.scan_once = json.scanner.py_make_scanner(self)
     def _parse_object(self, *args, **kwdargs):
+        # The object_hook and object_pairs_hook arguments are always the two
+        # positional arguments before memo (python 2 adds an encoding one
+        # at the front).
+        if args[-3] is None and args[-2] is None:
+            # Build the node straight from the key/value pairs rather than
+            # letting the base decoder build a dict which is then copied.
+            args = list(args)
+            if self.__share is not None:
+                args[-2] = self._interning_pairs_hook
+            elif self.__datetimekey is None:
+                args[-2] = self.__jsontreecls
+            else:
+                args[-2] = self._object_pairs_hook
+            return self.__parse_object(*args, **kwdargs)
         result = self.__parse_object(*args, **kwdargs)
-        return self.__jsontreecls(result[0]), result[1]
+        obj = result[0]
+        datetimekey = self.__datetimekey
+        if datetimekey is not None and isinstance(obj, dict):
+            decode = self.__datetimedecoder
+            for key, value in obj.items():
+                if not datetimekey(key):
+                    continue
+                if isinstance(value, basestring):
+                    obj[key] = decode(value)
+                elif isinstance(value, list):
+                    self._decode_list(value)
+        return self.__jsontreecls(obj), result[1]
     def _parse_string(self, *args, **kwdargs):
         value, idx = self.__parse_string(*args, **kwdargs)
         value = self.__datetimedecoder(value)
         return value, idx
+    def _object_pairs_hook(self, pairs):
+        decode = self.__datetimedecoder
+        datetimekey = self.__datetimekey
+        for i, (key, value) in enumerate(pairs):
+            if isinstance(value, basestring):
+                if datetimekey is None or datetimekey(key):
+                    pairs[i] = (key, decode(value))
+            elif isinstance(value, list):
+                if datetimekey is None or datetimekey(key):
+                    self._decode_list(value)
+        return self.__jsontreecls(pairs)
+    def _interning_pairs_hook(self, pairs):
+        decode = self.__datetimedecoder
+        share = self.__share
+        intern_key = self.__intern_key
+        datetimekey = self.__datetimekey
+        for i, (key, value) in enumerate(pairs):
+            key = intern_key(key)
+            if isinstance(value, basestring):
+                if datetimekey is None or datetimekey(key):
+                    value = decode(value)
+                else:
+                    value = share(value)
+            elif isinstance(value, list):
+                if datetimekey is None or datetimekey(key):
+                    self._decode_list(value)
+                else:
+                    self._decode_list(value, share)
+            pairs[i] = (key, value)
+        return self.__jsontreecls(pairs)
+    def _decode_list(self, values, decode=None):
+        # Objects inside the list have already been through the
+        # object_pairs_hook, so only strings and nested lists remain.
+        if decode is None:
+            decode = self.__datetimedecoder
+        for i, value in enumerate(values):
+            if isinstance(value, basestring):
+                values[i] = decode(value)
+            elif isinstance(value, list):
+                self._decode_list(value, decode)
+    def decode(self, s, *args, **kwdargs):
+        if self.__lazy:
+            start = json.decoder.WHITESPACE.match(s, 0).end()
+            end = len(s.rstrip())
+            if s[start:start + 1] == '{' and s[end - 1:end] == '}':
+                loader = _LazyLoader(s, self.scan_once, self.strict,
+                                     self.__jsontreecls,
+                                     self.__datetimedecoder,
+                                     self.__datetimekey)
+                started = _timer()
+                result = loader.root(start, len(s))
+                if self.__stats is not None:
+                    _report_stats(self.__stats, self.__counts, result,
+                                  _utf8_size(s), _timer() - started)
+                return result
+        return super(JSONTreeDecoder, self).decode(s, *args, **kwdargs)
+    def raw_decode(self, s, *args, **kwdargs):
+        if self.__lazy:
+            loader = _LazyLoader(s, self.scan_once, self.strict,
+                                 self.__jsontreecls, self.__datetimedecoder,
+                                 self.__datetimekey)
+            idx = args[0] if args else kwdargs.get('idx', 0)
+            return loader.value(idx, self.__datetimekey is None)
+        obj, end = super(JSONTreeDecoder, self).raw_decode(s, *args, **kwdargs)
+        if self.__accelerated and self.__datetimekey is None:
+            if isinstance(obj, basestring):
+                obj = self.__datetimedecoder(obj)
+            elif isinstance(obj, list):
+                self._decode_list(obj)
+        if self.__frozen and isinstance(obj, list):
+            obj = freeze(obj)
+        return obj, end
+    def _stats_raw_decode(self, s, *args, **kwdargs):
+        start = _timer()
+        obj, end = JSONTreeDecoder.raw_decode(self, s, *args, **kwdargs)
+        seconds = _timer() - start
+        idx = args[0] if args else kwdargs.get('idx', 0)
+        _report_stats(self.__stats, self.__counts, obj,
+                      _utf8_size(s, idx, end), seconds)
+        return obj, end
+    def _stream_stats(self):
+        # For _JSONStream, which retries raw_decode as more of the file is
+        # read and reports each value once itself: the stats and pending
+        # counts, or (None, None) when not collecting stats.
+        if self.__stats is None:
+            return None, None
+        return self.__stats, self.__counts
+
+class _lazyjsontree(object):
+    """Mixin for jsontree nodes whose members have not been decoded yet.
+    
+    Every method decodes the members and switches the node over to its
+    plain jsontreecls class before running, so after the first use there
+    is no overhead left.
+    """
+
+def _lazy_method(name):
+    def method(self, *args, **kwdargs):
+        _lazy_populate(self)
+        for arg in args:
+            # dict compares the storage of the other side directly.
+            if isinstance(arg, _lazyjsontree):
+                _lazy_populate(arg)
+        return getattr(self, name)(*args, **kwdargs)
+    method.__name__ = name
+    return method
+
+for _name in ('__getattr__', '__setattr__', '__getitem__', '__setitem__',
+              '__delitem__', '__contains__', '__iter__', '__len__', '__eq__',
+              '__ne__', '__repr__', '__reduce__', '__reduce_ex__', '__copy__',
+              '__or__', '__ror__', '__ior__', '__reversed__', 'keys', 'values',
+              'items', 'get', 'pop', 'popitem', 'setdefault', 'update', 'copy',
+              'clear'):
+    setattr(_lazyjsontree, _name, _lazy_method(_name))
+del _name
+
+_lazy_classes = {}
+
+def _lazy_class(jsontreecls):
+    try:
+        return _lazy_classes[jsontreecls]
+    except KeyError:
+        pass
+    if len(_lazy_classes) >= _mapped_class_cache_size:
+        _lazy_classes.clear()
+    cls = type('_lazyjsontree', (_lazyjsontree, jsontreecls), {})
+    _lazy_classes[jsontreecls] = cls
+    return cls
+
+# Key holding a lazy node's (loader, offset) until it is decoded. Keeping it
+# in the dict storage means C code that checks the size first (such as the
+# C encoder) sees a non-empty node and goes on to call items().
+_lazy_pending = object()
+
+def _lazy_populate(node):
+    pending = dict.pop(node, _lazy_pending)
+    loader, idx = pending
+    lazycls = node.__class__
+    object.__setattr__(node, '__class__', loader.jsontreecls)
+    try:
+        end = loader.populate(node, idx)
+        if loader.root_end is not None and loader.root_end[0] == idx:
+            end = json.decoder.WHITESPACE.match(loader.s, end).end()
+            if end != loader.root_end[1]:
+                raise _decode_error("Extra data", loader.s, end)
+    except:
+        # Leave the node pending, so every use raises the same error
+        # instead of finding it empty or half decoded.
+        dict.clear(node)
+        dict.__setitem__(node, _lazy_pending, pending)
+        object.__setattr__(node, '__class__', lazycls)
+        raise
+
+def _decode_error(msg, s, idx):
+    if hasattr(json, 'JSONDecodeError'):
+        return json.JSONDecodeError(msg, s, idx)
+    return ValueError('%s: char %d' % (msg, idx))
+
+class _LazyLoader(object):
+    """Decoder state shared by the lazy nodes of one document."""
+    def __init__(self, s, scan_once, strict, jsontreecls, datetimedecoder,
+                 datetimekey):
+        self.s = s
+        self.scan_once = scan_once
+        self.strict = strict
+        self.jsontreecls = jsontreecls
+        self.lazycls = _lazy_class(jsontreecls)
+        self.datetimedecoder = datetimedecoder
+        self.datetimekey = datetimekey
+        self.root_end = None
+
+    def root(self, idx, end):
+        """Return a lazy node for a whole document which is an object from
+        idx to end, without scanning for the end of the object. The check
+        that nothing follows the object is done when it is decoded.
+        """
+        node = self.lazycls()
+        dict.__setitem__(node, _lazy_pending, (self, idx))
+        self.root_end = (idx, end)
+        return node
+
+    def skip(self, idx):
+        # Find the end of the object or array starting at idx. Running the
+        # plain C scanner over it and dropping the result is much faster
+        # than stepping over it in python.
+        try:
+            return self.scan_once(self.s, idx)[1]
+        except StopIteration as err:
+            raise _decode_error("Expecting value", self.s, err.value)
+
+    def value(self, idx, decode_strings):
+        s = self.s
+        char = s[idx:idx + 1]
+        if char == '{':
+            node = self.lazycls()
+            dict.__setitem__(node, _lazy_pending, (self, idx))
+            return node, self.skip(idx)
+        if char == '[':
+            return self.array(idx, decode_strings)
+        try:
+            value, end = self.scan_once(s, idx)
+        except StopIteration as err:
+            raise _decode_error("Expecting value", s, err.value)
+        if decode_strings and isinstance(value, basestring):
+            value = self.datetimedecoder(value)
+        return value, end
+
+    def array(self, idx, decode_strings):
+        s = self.s
+        ws = json.decoder.WHITESPACE.match
+        values = []
+        idx = ws(s, idx + 1).end()
+        if s[idx:idx + 1] == ']':
+            return values, idx + 1
+        while True:
+            value, idx = self.value(idx, decode_strings)
+            values.append(value)
+            idx = ws(s, idx).end()
+            char = s[idx:idx + 1]
+            if char == ']':
+                return values, idx + 1
+            if char != ',':
+                raise _decode_error("Expecting ',' delimiter", s, idx)
+            idx = ws(s, idx + 1).end()
+
+    def populate(self, node, idx):
+        s = self.s
+        ws = json.decoder.WHITESPACE.match
+        datetimekey = self.datetimekey
+        idx = ws(s, idx + 1).end()
+        if s[idx:idx + 1] == '}':
+            return idx + 1
+        while True:
+            if s[idx:idx + 1] != '"':
+                raise _decode_error("Expecting property name enclosed in "
+                                    "double quotes", s, idx)
+            key, idx = json.decoder.scanstring(s, idx + 1, self.strict)
+            idx = ws(s, idx).end()
+            if s[idx:idx + 1] != ':':
+                raise _decode_error("Expecting ':' delimiter", s, idx)
+            idx = ws(s, idx + 1).end()
+            value, idx = self.value(idx, datetimekey is None or
+                                    datetimekey(key))
+            dict.__setitem__(node, key, value)
+            idx = ws(s, idx).end()
+            char = s[idx:idx + 1]
+            if char == '}':
+                return idx + 1
+            if char != ',':
+                raise _decode_error("Expecting ',' delimiter", s, idx)
+            idx = ws(s, idx + 1).end()
+
+_path_step_re = re.compile(
+    r'(?P<dot>\.?)(?P<name>[^.\[\]]+)|'
+    r'\[(?:(?P<index>-?\d+)|(?P<all>\*)|(?P<quote>["\'])(?P<key>.*?)(?P=quote))\]')
+_path_key = 'key'
+_path_index = 'index'
+_path_all = 'all'
+_path_missing = object()
+
+def _parse_path(expression):
+    steps = []
+    pos = 0
+    while pos < len(expression):
+        match = _path_step_re.match(expression, pos)
+        if match is None or (match.group('name') is not None and pos and
+                             not match.group('dot')):
+            raise ValueError("Invalid path %r at position %d" %
+                             (expression, pos))
+        name, index, key = match.group('name', 'index', 'key')
+        if name == '*' or match.group('all'):
+            steps.append((_path_all, None))
+        elif name is not None:
+            steps.append((_path_key, name))
+        elif index is not None:
+            steps.append((_path_index, int(index)))
+        else:
+            steps.append((_path_key, key))
+        pos = match.end()
+    return tuple(steps)
+
+def _path_step(obj, kind, key):
+    # Read one step without auto-vivifying: get() never calls __missing__.
+    if kind is _path_key:
+        try:
+            get = obj.get
+        except AttributeError:
+            return _path_missing
+        return get(key, _path_missing)
+    if isinstance(obj, (list, tuple)):
+        try:
+            return obj[key]
+        except IndexError:
+            pass
+    return _path_missing
+
+class path(object):
+    """Compiled accessor for a dotted path into a tree, such as 'a.b[3].c'.
+    
+    Names are separated by dots, [n] indexes an array (negative indexes
+    count from the end) and ['name'] reads keys which contain dots or
+    brackets. The path is parsed once and can then be applied to any
+    number of trees. Missing keys and indexes return the default rather
+    than auto-vivifying empty nodes:
+    
+    >>> tree = loads('{"a": {"b": [0, 1, 2, {"c": "deep"}]}}')
+    >>> get_c = path('a.b[3].c')
+    >>> get_c(tree)
+    'deep'
+    >>> path('a.x.y')(tree, 'missing'), 'x' in tree.a
+    ('missing', False)
+    
+    A * segment (or [*]) matches every element of an array or every value
+    of an object, and the path then returns a flat list of the matches,
+    with the default for branches missing the rest of the path:
+    
+    >>> tree = loads('{"items": [{"id": 1}, {"id": 2}, {}]}')
+    >>> path('items[*].id')(tree)
+    [1, 2, None]
+    >>> path('items[*].id').map([tree, jsontree()], default=0)
+    [[1, 2, 0], []]
+    """
+    def __init__(self, expression):
+        self.expression = expression
+        self.steps = _parse_path(expression)
+        self.wildcard = any(kind is _path_all for kind, key in self.steps)
+    
+    def __call__(self, tree, default=None):
+        if self.wildcard:
+            results = []
+            self._collect(tree, 0, default, False, results)
+            return results
+        # _path_step inlined, this is the hot path.
+        for kind, key in self.steps:
+            if kind is _path_key:
+                try:
+                    tree = tree.get(key, _path_missing)
+                except AttributeError:
+                    return default
+            elif isinstance(tree, (list, tuple)):
+                try:
+                    tree = tree[key]
+                except IndexError:
+                    return default
+            else:
+                return default
+            if tree is _path_missing:
+                return default
+        return tree
+    
+    get = __call__
+    
+    def map(self, trees, default=None):
+        """Apply the path to each tree in an iterable, returning a list."""
+        return [self(tree, default) for tree in trees]
+    
+    def _collect(self, obj, start, default, matched, results):
+        steps = self.steps
+        for i in range(start, len(steps)):
+            kind, key = steps[i]
+            if kind is _path_all:
+                if isinstance(obj, (list, tuple)):
+                    children = obj
+                elif isinstance(obj, collections_abc.Mapping):
+                    children = obj.values()
+                else:
+                    break
+                for child in children:
+                    self._collect(child, i + 1, default, True, results)
+                return
+            obj = _path_step(obj, kind, key)
+            if obj is _path_missing:
+                break
+        else:
+            results.append(obj)
+            return
+        if matched:
+            results.append(default)
+    
+    def __repr__(self):
+        return 'path(%r)' % (self.expression,)
+
+def _pointer_escape(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+def _pointer_tokens(pointer):
+    if not pointer:
+        return []
+    if pointer[0] != '/':
+        raise ValueError("Invalid JSON pointer %r" % (pointer,))
+    return [token.replace('~1', '/').replace('~0', '~')
+            for token in pointer[1:].split('/')]
+
+def _same_value(a, b):
+    # Equal as JSON values: datetimes by value, but true is not 1.
+    return a == b and isinstance(a, bool) == isinstance(b, bool)
+
+def diff(a, b):
+    """Return the RFC 6902 JSON Patch operations, as a list of dicts, which
+    turn tree a into tree b. Subtrees which are the same object are skipped
+    without being walked, and datetimes are compared by value. Arrays are
+    compared position by position, with elements added or removed at the
+    end.
+    
+    >>> a = loads('{"name": "x", "tags": ["a", "b"], "meta": {"rev": 1}}')
+    >>> b = clone(a)
+    >>> b.meta.rev = 2
+    >>> b.tags.pop()
+    'b'
+    >>> b.owner = 'doug'
+    >>> for op in diff(a, b):
+    ...     print(dumps(op, sort_keys=True))
+    {"op": "remove", "path": "/tags/1"}
+    {"op": "replace", "path": "/meta/rev", "value": 2}
+    {"op": "add", "path": "/owner", "value": "doug"}
+    >>> apply_patch(a, diff(a, b)) == b
+    True
+    """
+    ops = []
+    def _diff(a, b, pointer):
+        if a is b:
+            return
+        if (isinstance(a, collections_abc.Mapping) and
+                isinstance(b, collections_abc.Mapping)):
+            for key in a:
+                if key in b:
+                    _diff(a[key], b[key], pointer + '/' + _pointer_escape(key))
+                else:
+                    ops.append({'op': 'remove',
+                                'path': pointer + '/' + _pointer_escape(key)})
+            for key in b:
+                if key not in a:
+                    ops.append({'op': 'add',
+                                'path': pointer + '/' + _pointer_escape(key),
+                                'value': b[key]})
+        elif isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+            common = min(len(a), len(b))
+            for index in range(common):
+                _diff(a[index], b[index], '%s/%d' % (pointer, index))
+            for index in range(len(a) - 1, common - 1, -1):
+                ops.append({'op': 'remove', 'path': '%s/%d' % (pointer, index)})
+            for index in range(common, len(b)):
+                ops.append({'op': 'add', 'path': pointer + '/-',
+                            'value': b[index]})
+        elif not _same_value(a, b):
+            ops.append({'op': 'replace', 'path': pointer, 'value': b})
+    _diff(a, b, '')
+    return ops
+
+def _pointer_child(container, token, pointer):
+    if isinstance(container, collections_abc.Mapping):
+        if token in container:
+            return container[token]
+    elif isinstance(container, (list, tuple)):
+        if token.isdigit() and int(token) < len(container):
+            return container[int(token)]
+    raise ValueError("Path %r does not exist" % (pointer,))
+
+def _pointer_parent(tree, pointer):
+    tokens = _pointer_tokens(pointer)
+    if not tokens:
+        return None, None
+    parent = tree
+    for token in tokens[:-1]:
+        parent = _pointer_child(parent, token, pointer)
+    return parent, tokens[-1]
+
+def _pointer_index(parent, token, pointer, insert=False):
+    if token == '-' and insert:
+        return len(parent)
+    if not token.isdigit() or int(token) > len(parent) - (not insert):
+        raise ValueError("Path %r does not exist" % (pointer,))
+    return int(token)
+
+def apply_patch(tree, ops, jsontreecls=jsontree):
+    """Apply RFC 6902 JSON Patch operations (add, remove, replace, move,
+    copy and test) to a tree in place, and return it. Values added are
+    cloned with jsontreecls, so the tree never shares nodes with the
+    operations. A patch replacing the whole document returns the new
+    value. Invalid operations or paths raise ValueError.
+    
+    >>> tree = loads('{"a": {"b": 1}, "list": [1, 2]}')
+    >>> apply_patch(tree, [{'op': 'move', 'from': '/a/b', 'path': '/c'},
+    ...                    {'op': 'add', 'path': '/list/0', 'value': 0},
+    ...                    {'op': 'test', 'path': '/list', 'value': [0, 1, 2]}])
+    jsontree(<class 'jsontree.jsontree'>, {'a': jsontree(<class 'jsontree.jsontree'>, {}), 'list': [0, 1, 2], 'c': 1})
+    """
+    def _get(pointer):
+        value = tree
+        for token in _pointer_tokens(pointer):
+            value = _pointer_child(value, token, pointer)
+        return value
+    def _remove(pointer):
+        parent, token = _pointer_parent(tree, pointer)
+        if parent is None:
+            raise ValueError("Can not remove the whole document")
+        if isinstance(parent, collections_abc.Mapping):
+            if token not in parent:
+                raise ValueError("Path %r does not exist" % (pointer,))
+            return parent.pop(token)
+        return parent.pop(_pointer_index(parent, token, pointer))
+    def _add(pointer, value, replace=False):
+        parent, token = _pointer_parent(tree, pointer)
+        if parent is None:
+            return value
+        if isinstance(parent, collections_abc.Mapping):
+            if replace and token not in parent:
+                raise ValueError("Path %r does not exist" % (pointer,))
+            parent[token] = value
+        elif replace:
+            parent[_pointer_index(parent, token, pointer)] = value
+        else:
+            parent.insert(_pointer_index(parent, token, pointer, True), value)
+        return tree
+    for op in ops:
+        kind = op.get('op')
+        pointer = op.get('path')
+        if pointer is None:
+            raise ValueError("Operation %r has no path" % (op,))
+        if kind == 'add':
+            tree = _add(pointer, clone(op['value'], jsontreecls))
+        elif kind == 'remove':
+            _remove(pointer)
+        elif kind == 'replace':
+            tree = _add(pointer, clone(op['value'], jsontreecls), True)
+        elif kind == 'move':
+            if pointer.startswith(op['from'] + '/'):
+                raise ValueError("Can not move %r into itself" % (op['from'],))
+            tree = _add(pointer, _remove(op['from']))
+        elif kind == 'copy':
+            tree = _add(pointer, clone(_get(op['from']), jsontreecls))
+        elif kind == 'test':
+            if diff(_get(pointer), op['value']):
+                raise ValueError("Test failed at %r" % (pointer,))
+        else:
+            raise ValueError("Unknown operation %r" % (kind,))
+    return tree
+
+_backends = {}
+_backend_preference = ['orjson', 'ujson', 'simdjson', 'json']
+_default_backend = 'json'
+_backend_unused = object()
+_backend_errors = (ValueError, TypeError, OverflowError)
+_backend_loads_options = frozenset(['jsontreecls', 'datetimedecoder',
+                                    'datetimekeys', 'frozen', 'accelerate'])
+# Beyond this a float may be an integer a backend could not hold exactly.
+_backend_float_limit = float(2 ** 63)
+
+def register_backend(name, loads=None, dumps=None):
+    """Register a JSON backend for loads/dumps/load/dump/clone.
+    
+    loads(s) must return plain dicts, lists and scalars, which are then
+    converted to jsontree nodes (and datetimes) the same way the stdlib
+    path would. dumps(obj, default) must serialize dict subclasses, lists
+    and tuples natively and call default for anything else, returning str
+    or utf-8 bytes. Leave either as None to use the stdlib json module for
+    that direction. orjson, ujson and simdjson are registered when they are
+    installed, and 'json' is always there.
+    
+    A backend is only used when the call has no stdlib specific options
+    (cls, object_hook, indent, sort_keys, ...), and any error it raises is
+    retried on the stdlib path, so results and errors match the stdlib.
+    Loaded floats of 2**63 or more are also retried there, as a backend may
+    have turned a larger integer into one, and so are documents holding
+    values orjson would serialize itself where the stdlib calls default
+    (UUIDs, enums, dataclasses and non-string keys other than the ones json
+    converts). Output that needs escaping for ensure_ascii is written by
+    the stdlib too. Backend output is compact and may write floats in
+    another (equal) notation. Otherwise every registered backend gives the
+    same results as the stdlib, even on the edge cases:
+    
+    >>> docs = ['[123456789012345678901234, -1e19, 0.5, 9007199254740993]',
+    ...         '{"name": "caf\\\\u00e9 \\\\ud83d\\\\ude00", "path": "a/b"}',
+    ...         '{"score": NaN, "limit": [Infinity, -Infinity]}',
+    ...         '{"at": "2013-04-29T22:45:35", "log": ["2013-04-29"]}']
+    >>> def conforms(name, doc, **kargs):
+    ...     tree = loads(doc, **kargs)
+    ...     def same_dumps(**options):
+    ...         return dumps(tree, backend=name, **options) in (
+    ...             dumps(tree, **options),
+    ...             dumps(tree, separators=(',', ':'), **options))
+    ...     return (repr(loads(doc, backend=name, **kargs)) == repr(tree) and
+    ...             same_dumps() and same_dumps(ensure_ascii=False))
+    >>> [(name, doc) for name in backends() for doc in docs
+    ...  if not (conforms(name, doc) and conforms(name, doc, frozen=True) and
+    ...          conforms(name, doc, datetimekeys=['at']))]
+    []
+    >>> import dataclasses, enum, uuid
+    >>> objs = [[uuid.UUID(int=1)], [dataclasses.make_dataclass('Point', ['x'])(1)],
+    ...         [enum.Enum('Color', 'red').red], {datetime.datetime(2020, 1, 1): 1},
+    ...         {1: 'a', 2.5: 'b', None: 'c', False: 'd'}]
+    >>> def outcome(obj, **kargs):
+    ...     try:
+    ...         return dumps(obj, **kargs).replace(' ', '')
+    ...     except (TypeError, ValueError) as exc:
+    ...         return type(exc).__name__
+    >>> [(name, obj) for name in backends() for obj in objs
+    ...  if outcome(obj, backend=name) != outcome(obj)]
+    []
+    """
+    _backends[name] = (loads, dumps)
+
+def backends():
+    """Return the names of the registered backends."""
+    return sorted(_backends)
+
+def set_default_backend(name):
+    """Set the backend used when no backend argument is passed. 'auto'
+    picks the first registered of orjson, ujson and simdjson, falling back
+    to the stdlib 'json' backend, which is the initial default.
+    """
+    global _default_backend
+    _resolve_backend(name)
+    _default_backend = name
+
+def _resolve_backend(name):
+    if name is None:
+        name = _default_backend
+    if name == 'auto':
+        name = next(preferred for preferred in _backend_preference
+                    if preferred in _backends)
+    try:
+        return _backends[name]
+    except KeyError:
+        raise ValueError("Unknown backend %r" % (name,))
+
+def _from_backend(obj, jsontreecls, datetimedecoder, datetimekey, frozen):
+    # Convert the plain containers a backend returned, decoding datetimes
+    # in exactly the places JSONTreeDecoder would.
+    if frozen:
+        jsontreecls = _frozen_from_pairs
+    def _list(values, strings):
+        return [_object(value) if isinstance(value, dict) else
+                _list(value, strings) if isinstance(value, list) else
+                datetimedecoder(value) if strings and
+                isinstance(value, basestring) else
+                _backend_float(value) if value.__class__ is float else value
+                for value in values]
+    def _object(obj):
+        # Replacing the values of existing keys while iterating is safe, and
+        # lets jsontreecls copy the finished dict in one go.
+        for key, value in obj.items():
+            if isinstance(value, dict):
+                obj[key] = _object(value)
+            elif datetimekey is None or datetimekey(key):
+                if isinstance(value, basestring):
+                    obj[key] = datetimedecoder(value)
+                elif isinstance(value, list):
+                    obj[key] = _list(value, True)
+                elif value.__class__ is float:
+                    _backend_float(value)
+            elif isinstance(value, list):
+                obj[key] = _list(value, False)
+            elif value.__class__ is float:
+                _backend_float(value)
+        return jsontreecls(obj)
+    if isinstance(obj, dict):
+        return _object(obj)
+    if isinstance(obj, list):
+        obj = _list(obj, datetimekey is None)
+        return freeze(obj) if frozen else obj
+    if datetimekey is None and isinstance(obj, basestring):
+        return datetimedecoder(obj)
+    if obj.__class__ is float:
+        _backend_float(obj)
+    return obj
+
+def _backend_float(value):
+    # Reject a float that may have been a big integer in the document.
+    if value >= _backend_float_limit or value <= -_backend_float_limit:
+        raise OverflowError("%r may be a rounded integer" % (value,))
+    return value
+
+def _backend_loads(s, backend, kargs):
+    backend_loads = _resolve_backend(backend)[0]
+    if backend_loads is None or not _backend_loads_options.issuperset(kargs):
+        return _backend_unused
+    datetimekeys = kargs.get('datetimekeys')
+    try:
+        return _from_backend(backend_loads(s),
+                             kargs.get('jsontreecls', jsontree),
+                             kargs.get('datetimedecoder', _datetimedecoder),
+                             None if datetimekeys is None else
+                             _datetimekey_matcher(datetimekeys),
+                             kargs.get('frozen', False))
+    except _backend_errors:
+        return _backend_unused
+
+def _backend_dumps(obj, backend, ensure_ascii, kargs):
+    backend_dumps = _resolve_backend(backend)[1]
+    if backend_dumps is None or not set(kargs) <= set(['datetimeencoder']):
+        return _backend_unused
+    encoders = _encoder_table(kargs.get('datetimeencoder', _datetimeencoder),
+                              None)
+    def default(obj):
+        encoder = encoders.get(obj.__class__)
+        if encoder is None:
+            encoder = _encoder_resolve(encoders, obj.__class__)
+            if encoder is None:
+                raise TypeError("%r is not JSON serializable" % (obj,))
+        return encoder(obj)
+    try:
+        result = backend_dumps(obj, default)
+    except _backend_errors:
+        return _backend_unused
+    if isinstance(result, bytes):
+        result = result.decode('utf-8')
+    if ensure_ascii and not (_isascii(result) and u'\x7f' not in result):
+        # json escapes these faster than they could be escaped here.
+        return _backend_unused
+    return result
+
+register_backend('json')
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    import enum
+    import uuid
+    # Datetimes and dataclasses are passed through to default, so the
+    # datetimeencoder runs and anything else raises like the stdlib. Keys
+    # that are not strings make orjson raise, leaving them to the stdlib.
+    _orjson_options = (orjson.OPT_PASSTHROUGH_DATETIME |
+                       orjson.OPT_PASSTHROUGH_DATACLASS)
+    _orjson_plain = frozenset([type(u''), int, bool, type(None)])
+    def _orjson_differs(obj):
+        # Whether orjson wrote obj other than json would: NaN and Infinity
+        # as null, or a UUID or Enum it serializes itself where json calls
+        # default.
+        plain = _orjson_plain
+        def visit(values):
+            for value in values:
+                cls = value.__class__
+                if cls in plain:
+                    continue
+                if cls is float:
+                    # Only NaN and the infinities give a (true) NaN here.
+                    if value - value:
+                        return True
+                elif isinstance(value, dict):
+                    if visit(value.values()):
+                        return True
+                elif isinstance(value, (list, tuple)):
+                    if visit(value):
+                        return True
+                elif isinstance(value, frozenjsontree):
+                    if visit(value._values()):
+                        return True
+                elif isinstance(value, (uuid.UUID, enum.Enum)):
+                    return True
+            return False
+        return visit((obj,))
+    def _orjson_dumps(obj, default):
+        result = orjson.dumps(obj, default, _orjson_options)
+        if _orjson_differs(obj):
+            raise ValueError("orjson would not match json")
+        return result
+    register_backend('orjson', orjson.loads, _orjson_dumps)
+try:
+    import ujson
+except ImportError:
+    pass
+else:
+    register_backend('ujson', ujson.loads, lambda obj, default:
+                     ujson.dumps(obj, default=default, ensure_ascii=False,
+                                 escape_forward_slashes=False))
+try:
+    import simdjson
+except ImportError:
+    pass
+else:
+    register_backend('simdjson', simdjson.loads)
+
+# The binary format written by dumpb and read by loadb is the magic bytes
+# followed by two MessagePack values: an array holding every object key
+# once, and the root value, in which map keys are indexes into that array.
+# Datetimes are ext type 1, a big endian int64 of the microseconds from
+# 0001-01-01T00:00:00 to the wall clock time and an int16 of the UTC offset
+# in minutes (-32768 when naive). Integers beyond 64 bits are ext type 2,
+# holding their decimal digits.
+_binary_magic = b'JTB\x01'
+_binary_datetime = 1
+_binary_bigint = 2
+_binary_naive = -32768
+_binary_epoch = datetime.datetime(1, 1, 1)
+_binary_struct = struct.Struct('>qh')
+_binary_tzinfos = {}
+
+try:
+    import msgpack as _msgpack
+except ImportError:
+    _msgpack = None
+
+def _binary_datetime_payload(value):
+    offset = value.utcoffset()
+    if offset is None:
+        minutes = _binary_naive
+    else:
+        minutes, seconds = divmod(offset.days * 86400 + offset.seconds, 60)
+        if seconds or offset.microseconds:
+            raise ValueError("Can not store the UTC offset of %r" % (value,))
+    seconds = (((value.toordinal() - 1) * 24 + value.hour) * 60 +
+               value.minute) * 60 + value.second
+    return _binary_struct.pack(seconds * 1000000 + value.microsecond, minutes)
+
+def _binary_datetime_value(payload):
+    micros, minutes = _binary_struct.unpack(payload)
+    value = _binary_epoch + datetime.timedelta(microseconds=micros)
+    if minutes == _binary_naive:
+        return value
+    try:
+        tz = _binary_tzinfos[minutes]
+    except KeyError:
+        tz = _binary_tzinfos[minutes] = _tzinfo('%s%02d%02d' % (
+            '-' if minutes < 0 else '+', abs(minutes) // 60,
+            abs(minutes) % 60))
+    return value.replace(tzinfo=tz)
+
+def _binary_ext(code, payload):
+    if code == _binary_datetime:
+        return _binary_datetime_value(bytes(payload))
+    if code == _binary_bigint:
+        return int(bytes(payload).decode('ascii'))
+    raise ValueError("Unknown ext type %d" % (code,))
+
+def _binary_key_table(keys):
+    # The keys in index order, from the table the encoders fill.
+    return [entry[1] if entry.__class__ is tuple else entry
+            for entry in sorted(keys, key=keys.get)]
+
+def _binary_encode(root):
+    # Keys other than strings are entered as (type, key), as the equal
+    # keys 1, True and 1.0 are distinct in the document.
+    keys = {}
+    out = bytearray()
+    pack = struct.pack
+    def header(n, fix, fixsize, code8, code16, code32):
+        if n < fixsize:
+            out.append(fix | n)
+        elif n < 0x100 and code8:
+            out.extend(pack('>BB', code8, n))
+        elif n < 0x10000:
+            out.extend(pack('>BH', code16, n))
+        else:
+            out.extend(pack('>BI', code32, n))
+    def ext(code, payload):
+        n = len(payload)
+        if n in (1, 2, 4, 8, 16):
+            out.extend(pack('>BB', 0xd3 + n.bit_length(), code))
+        else:
+            header(n, 0, 0, 0xc7, 0xc8, 0xc9)
+            out.append(code)
+        out.extend(payload)
+    def integer(obj):
+        if 0 <= obj < 0x80 or -32 <= obj < 0:
+            out.append(obj & 0xff)
+        elif 0 <= obj < 0x10000000000000000:
+            for code, fmt, limit in ((0xcc, '>BB', 0x100),
+                                     (0xcd, '>BH', 0x10000),
+                                     (0xce, '>BI', 0x100000000),
+                                     (0xcf, '>BQ', 0x10000000000000000)):
+                if obj < limit:
+                    out.extend(pack(fmt, code, obj))
+                    break
+        elif -0x8000000000000000 <= obj < 0:
+            for code, fmt, limit in ((0xd0, '>Bb', 0x80),
+                                     (0xd1, '>Bh', 0x8000),
+                                     (0xd2, '>Bi', 0x80000000),
+                                     (0xd3, '>Bq', 0x8000000000000000)):
+                if obj >= -limit:
+                    out.extend(pack(fmt, code, obj))
+                    break
+        else:
+            ext(_binary_bigint, str(obj).encode('ascii'))
+    text = type(u'')
+    def encode(obj):
+        # Exact type checks first; isinstance against frozenjsontree (an
+        # abstract base class) is comparatively slow.
+        cls = obj.__class__
+        if cls is text or isinstance(obj, basestring):
+            data = obj.encode('utf-8')
+            if len(data) < 32:
+                out.append(0xa0 | len(data))
+            else:
+                header(len(data), 0xa0, 32, 0xd9, 0xda, 0xdb)
+            out.extend(data)
+        elif cls is int:
+            integer(obj)
+        elif isinstance(obj, dict) or isinstance(obj, frozenjsontree):
+            header(len(obj), 0x80, 16, 0, 0xde, 0xdf)
+            for key, value in obj.items():
+                entry = key if key.__class__ is str else (key.__class__, key)
+                index = keys.get(entry)
+                if index is None:
+                    if not (key is None or isinstance(
+                            key, (basestring, int, float))):
+                        raise TypeError("Can not store the key %r" % (key,))
+                    index = keys[entry] = len(keys)
+                if index < 0x80:
+                    out.append(index)
+                else:
+                    integer(index)
+                encode(value)
+        elif cls is list or cls is tuple:
+            header(len(obj), 0x90, 16, 0, 0xdc, 0xdd)
+            for value in obj:
+                encode(value)
+        elif obj is None:
+            out.append(0xc0)
+        elif obj is True or obj is False:
+            out.append(0xc3 if obj else 0xc2)
+        elif isinstance(obj, int):
+            integer(obj)
+        elif isinstance(obj, float):
+            out.extend(pack('>Bd', 0xcb, obj))
+        elif isinstance(obj, (list, tuple)):
+            header(len(obj), 0x90, 16, 0, 0xdc, 0xdd)
+            for value in obj:
+                encode(value)
+        elif isinstance(obj, datetime.datetime):
+            ext(_binary_datetime, _binary_datetime_payload(obj))
+        elif isinstance(obj, (bytes, bytearray)):
+            header(len(obj), 0, 0, 0xc4, 0xc5, 0xc6)
+            out.extend(obj)
+        elif isinstance(obj, collections_abc.Mapping):
+            encode(dict(obj))
+        else:
+            raise TypeError("%r can not be stored by dumpb" % (obj,))
+    encode(root)
+    body = bytes(out)
+    del out[:]
+    encode(_binary_key_table(keys))
+    return _binary_magic + bytes(out) + body
+
+def _binary_encode_accelerated(root):
+    # Keys other than strings are entered as (type, key) like in
+    # _binary_encode.
+    keys = {}
+    nested = (dict, list, tuple)
+    def walk(obj):
+        # Replace the keys with their indexes; msgpack does the rest, and
+        # calls default for datetimes, other mappings and big integers.
+        if isinstance(obj, (list, tuple)):
+            return [walk(value) if isinstance(value, nested) else value
+                    for value in obj]
+        result = {}
+        for key, value in obj.items():
+            entry = key if key.__class__ is str else (key.__class__, key)
+            index = keys.get(entry)
+            if index is None:
+                if not (key is None or isinstance(
+                        key, (basestring, int, float))):
+                    raise TypeError("Can not store the key %r" % (key,))
+                index = keys[entry] = len(keys)
+            result[index] = walk(value) if isinstance(value, nested) else value
+        return result
+    def default(obj):
+        if isinstance(obj, datetime.datetime):
+            return _msgpack.ExtType(_binary_datetime,
+                                    _binary_datetime_payload(obj))
+        if isinstance(obj, collections_abc.Mapping):
+            return walk(obj)
+        if isinstance(obj, int):
+            return _msgpack.ExtType(_binary_bigint, str(obj).encode('ascii'))
+        raise TypeError("%r can not be stored by dumpb" % (obj,))
+    packer = _msgpack.Packer(default=default, use_bin_type=True)
+    body = packer.pack(walk(root) if isinstance(root, nested) else root)
+    return (_binary_magic +
+            packer.pack(_binary_key_table(keys)) +
+            body)
+
+def _binary_decode(data, jsontreecls, frozen):
+    unpack_from = struct.unpack_from
+    if frozen:
+        jsontreecls = _frozen_from_pairs
+    def sized(n, pos, kind):
+        end = pos + n + (kind == 0xc7)
+        if end > len(data):
+            raise IndexError("Truncated binary document")
+        if kind == 0xa0:
+            return data[pos:end].decode('utf-8'), end
+        # Positive fixints (every key index below 128) and short strings are
+        # read inline, a truncated short string is caught by the final
+        # length check.
+        if kind == 0x90:
+            values = []
+            for _ in range(n):
+                b = data[pos]
+                if b < 0x80:
+                    value = b
+                    pos += 1
+                elif 0xa0 <= b < 0xc0:
+                    value = data[pos + 1:pos + 1 + (b & 0x1f)].decode('utf-8')
+                    pos += 1 + (b & 0x1f)
+                else:
+                    value, pos = read(pos)
+                values.append(value)
+            return (tuple(values) if frozen else values), pos
+        if kind == 0x80:
+            pairs = []
+            for _ in range(n):
+                index = data[pos]
+                if index < 0x80:
+                    pos += 1
+                else:
+                    index, pos = read(pos)
+                b = data[pos]
+                if b < 0x80:
+                    value = b
+                    pos += 1
+                elif 0xa0 <= b < 0xc0:
+                    value = data[pos + 1:pos + 1 + (b & 0x1f)].decode('utf-8')
+                    pos += 1 + (b & 0x1f)
+                else:
+                    value, pos = read(pos)
+                pairs.append((keys[index], value))
+            return jsontreecls(pairs), pos
+        if kind == 0xc4:
+            return bytes(data[pos:end]), end
+        code = unpack_from('>b', data, pos)[0]
+        return _binary_ext(code, data[pos + 1:end]), end
+    # Sized values: (kind, struct format of the length, or a fixed length).
+    lengths = {
+        0xc4: (0xc4, '>B'), 0xc5: (0xc4, '>H'), 0xc6: (0xc4, '>I'),
+        0xc7: (0xc7, '>B'), 0xc8: (0xc7, '>H'), 0xc9: (0xc7, '>I'),
+        0xd4: (0xc7, 1), 0xd5: (0xc7, 2), 0xd6: (0xc7, 4), 0xd7: (0xc7, 8),
+        0xd8: (0xc7, 16), 0xd9: (0xa0, '>B'), 0xda: (0xa0, '>H'),
+        0xdb: (0xa0, '>I'), 0xdc: (0x90, '>H'), 0xdd: (0x90, '>I'),
+        0xde: (0x80, '>H'), 0xdf: (0x80, '>I')}
+    scalars = {
+        0xca: ('>f', 4), 0xcb: ('>d', 8), 0xcc: ('>B', 1), 0xcd: ('>H', 2),
+        0xce: ('>I', 4), 0xcf: ('>Q', 8), 0xd0: ('>b', 1), 0xd1: ('>h', 2),
+        0xd2: ('>i', 4), 0xd3: ('>q', 8)}
+    constants = {0xc0: None, 0xc2: False, 0xc3: True}
+    def read(pos):
+        b = data[pos]
+        pos += 1
+        if b < 0x80:
+            return b, pos
+        if b >= 0xe0:
+            return b - 0x100, pos
+        if b < 0xc0:
+            return sized(b & (0x1f if b >= 0xa0 else 0x0f), pos, b & 0xf0
+                         if b < 0xa0 else 0xa0)
+        if b in constants:
+            return constants[b], pos
+        if b in scalars:
+            fmt, size = scalars[b]
+            return unpack_from(fmt, data, pos)[0], pos + size
+        kind, length = lengths[b]
+        if isinstance(length, int):
+            return sized(length, pos, kind)
+        n = unpack_from(length, data, pos)[0]
+        return sized(n, pos + struct.calcsize(length), kind)
+    keys = ()
+    keys, pos = read(len(_binary_magic))
+    if not isinstance(keys, (list, tuple)):
+        raise ValueError("Invalid binary document key table")
+    root, pos = read(pos)
+    if pos > len(data):
+        raise ValueError("Truncated binary document")
+    if pos < len(data):
+        raise ValueError("Extra data after the binary document")
+    return root
+
+def _binary_decode_accelerated(data, jsontreecls, frozen):
+    keys = []
+    if frozen:
+        jsontreecls = _frozen_from_pairs
+    def object_pairs_hook(pairs):
+        return jsontreecls([(keys[index], value) for index, value in pairs])
+    unpacker = _msgpack.Unpacker(raw=False, use_list=not frozen,
+                                 strict_map_key=False, ext_hook=_binary_ext,
+                                 object_pairs_hook=object_pairs_hook,
+                                 max_buffer_size=max(len(data), 1 << 20))
+    unpacker.feed(memoryview(data)[len(_binary_magic):])
+    try:
+        keys.extend(unpacker.unpack())
+        root = unpacker.unpack()
+    except _msgpack.OutOfData:
+        raise ValueError("Truncated binary document")
+    if unpacker.tell() != len(data) - len(_binary_magic):
+        raise ValueError("Extra data after the binary document")
+    return root
+
+def dumpb(obj, accelerate=True):
+    """Serialize a tree to the compact binary format read by loadb.
+    
+    The format is MessagePack with every object key stored once per
+    document, and datetimes (with their UTC offset) stored natively rather
+    than as ISO strings. Mappings, lists and tuples, strings, numbers,
+    booleans, None, bytes and datetimes can be stored. Strings are kept as
+    strings, even when they look like datetimes. The msgpack package is
+    used when it is installed, unless accelerate is False.
+    
+    >>> tree = jsontree(status='open')
+    >>> eastern = datetime.timezone(datetime.timedelta(hours=-4))
+    >>> tree.created = datetime.datetime(2013, 4, 29, 22, 45, 35, tzinfo=eastern)
+    >>> data = dumpb([tree, tree])
+    >>> len(data) < len(dumps([tree, tree]))
+    True
+    >>> loadb(data) == [tree, tree]
+    True
+    
+    Keys that are not strings keep their type:
+    
+    >>> loadb(dumpb([{1: 'a'}, {True: 'b'}, {1.0: 'c'}]))
+    [jsontree(<class 'jsontree.jsontree'>, {1: 'a'}), jsontree(<class 'jsontree.jsontree'>, {True: 'b'}), jsontree(<class 'jsontree.jsontree'>, {1.0: 'c'})]
+    >>> loadb(dumpb([{1: 'a'}, {True: 'b'}], accelerate=False), accelerate=False)
+    [jsontree(<class 'jsontree.jsontree'>, {1: 'a'}), jsontree(<class 'jsontree.jsontree'>, {True: 'b'})]
+    """
+    if accelerate and _msgpack is not None:
+        return _binary_encode_accelerated(obj)
+    if sys.version_info.major == 2:
+        return str(_binary_encode(obj))
+    return _binary_encode(obj)
+
+def loadb(data, jsontreecls=jsontree, frozen=False, accelerate=True):
+    """Load a tree written by dumpb, building the mappings as jsontreecls
+    (or frozenjsontree records and tuples with frozen=True). The msgpack
+    package is used when it is installed, unless accelerate is False.
+    
+    >>> Tree = mapped_jsontree_class({'userId': 'user_id'})
+    >>> tree = loadb(dumpb({'user_id': 7}), jsontreecls=Tree)
+    >>> tree.userId
+    7
+    """
+    if bytes(data[:len(_binary_magic)]) != _binary_magic:
+        raise ValueError("Not a jsontree binary document")
+    if sys.version_info.major == 2:
+        data = bytearray(data)
+    try:
+        if accelerate and _msgpack is not None:
+            return _binary_decode_accelerated(data, jsontreecls, frozen)
+        return _binary_decode(data, jsontreecls, frozen)
+    except (IndexError, KeyError, struct.error) as exc:
+        raise ValueError("Invalid binary document: %r" % (exc,))
 
 def clone(root, jsontreecls=jsontree, datetimeencoder=_datetimeencoder,
-          datetimedecoder=_datetimedecoder):
-    """Clone an object by first searializing out and then loading it back in.
+          datetimedecoder=_datetimedecoder, normalize=False, backend=None):
+    """Clone an object by walking the structure, re-creating every mapping
+    as jsontreecls and every list or tuple as a list. Leaf values (strings,
+    numbers, datetimes, ...) are immutable and shared with the original.
+    
+    >>> tree = jsontree()
+    >>> tree.meta.created = datetime.datetime(2013, 4, 29, 22, 45, 35)
+    >>> tree.issues = [jsontree(id=1)]
+    >>> copied = clone(tree)
+    >>> copied == tree, copied.issues[0] is tree.issues[0]
+    (True, False)
+    >>> copied.meta.created is tree.meta.created
+    True
+    
+    Pass normalize=True to clone by first serializing out and then loading
+    it back in, which also converts keys to strings and runs the datetime
+    encoder and decoder over the values, using the given backend.
     """
-    return json.loads(json.dumps(root, cls=JSONTreeEncoder,
-                                 datetimeencoder=datetimeencoder),
-                      cls=JSONTreeDecoder, jsontreecls=jsontreecls,
-                      datetimedecoder=datetimedecoder)
+    if normalize:
+        return loads(dumps(root, datetimeencoder=datetimeencoder,
+                           backend=backend),
+                     jsontreecls=jsontreecls, datetimedecoder=datetimedecoder,
+                     backend=backend)
+    def _clone(obj):
+        if isinstance(obj, dict):
+            return jsontreecls([(key, _clone(value))
+                                for key, value in obj.items()])
+        if isinstance(obj, (list, tuple)):
+            return [_clone(value) for value in obj]
+        if isinstance(obj, collections_abc.Mapping):
+            return _clone(dict(obj))
+        return obj
+    return _clone(root)
     
 def dump(obj, fp, skipkeys=False, ensure_ascii=True, check_circular=True,
          allow_nan=True, cls=JSONTreeEncoder, indent=None, separators=None,
-         encoding="utf-8", default=None, sort_keys=False, **kargs):
+         encoding="utf-8", default=None, sort_keys=False, backend=None,
+         **kargs):
     """JSON serialize to file function that defaults the encoding class to be
-    JSONTreeEncoder
+    JSONTreeEncoder. See register_backend for the backend argument.
+    
+    Without indent the document is written in pieces encoded by the C
+    encoder (json.dump always uses the pure python one): any array or
+    object with more than 256 members, or holding one, is split into its
+    members (array members are encoded in runs of up to 256), so memory
+    stays bounded by the largest piece rather than the whole output. Output
+    is written in 65536 character chunks.
     """
+    if _resolve_backend(backend)[1] is not None:
+        fp.write(dumps(obj, skipkeys, ensure_ascii, check_circular, allow_nan,
+                       cls, indent, separators, encoding, default, sort_keys,
+                       backend, **kargs))
+        return
     if sys.version_info.major == 2:
         kargs['encoding'] = encoding
-    if sys.version_info.major > 2 :
-        kargs['sort_keys'] = sort_keys
-    kargs['default'] = default
-    return json.dump(obj, fp, skipkeys=skipkeys, ensure_ascii=ensure_ascii, 
-                     check_circular=check_circular, allow_nan=allow_nan,
-                     cls=cls, indent=indent, separators=separators, **kargs)
+    encoder = cls(skipkeys=skipkeys, ensure_ascii=ensure_ascii,
+                  check_circular=check_circular, allow_nan=allow_nan,
+                  indent=indent, separators=separators, default=default,
+                  sort_keys=sort_keys, **kargs)
+    if indent is None and cls is JSONTreeEncoder and 'stats' not in kargs:
+        # With stats every piece would be reported as a document.
+        chunks = _iterencode_pieces(_one_shot_encoder(encoder), encoder, obj,
+                                    _dump_split_size)
+    else:
+        chunks = encoder.iterencode(obj)
+    _write_chunks(fp, chunks, 65536)
 
 def dumps(obj, skipkeys=False, ensure_ascii=True, check_circular=True,
           allow_nan=True, cls=JSONTreeEncoder, indent=None, separators=None,
-          encoding='utf-8', default=None, sort_keys=False, **kargs):
+          encoding='utf-8', default=None, sort_keys=False, backend=None,
+          **kargs):
     """JSON serialize to string function that defaults the encoding class to be
-    JSONTreeEncoder
+    JSONTreeEncoder. See register_backend for the backend argument.
     """
+    if (not skipkeys and check_circular and allow_nan and indent is None
+            and cls is JSONTreeEncoder and separators is None
+            and default is None and not sort_keys):
+        result = _backend_dumps(obj, backend, ensure_ascii, kargs)
+        if result is not _backend_unused:
+            return result
 
     if sys.version_info.major == 2:
         kargs['encoding'] = encoding
@@ -277,10 +2210,14 @@ def dumps(obj, skipkeys=False, ensure_ascii=True, check_circular=True,
 
 def load(fp, encoding=None, cls=JSONTreeDecoder, object_hook=None,
          parse_float=None, parse_int=None, parse_constant=None,
-         object_pairs_hook=None, **kargs):
+         object_pairs_hook=None, backend=None, **kargs):
     """JSON load from file function that defaults the loading class to be
-    JSONTreeDecoder
+    JSONTreeDecoder. See register_backend for the backend argument.
     """
+    if _resolve_backend(backend)[0] is not None:
+        return loads(fp.read(), encoding, cls, object_hook, parse_float,
+                     parse_int, parse_constant, object_pairs_hook, backend,
+                     **kargs)
     if sys.version_info.major == 2:
         kargs['encoding'] = encoding
     return json.load(fp, cls=cls, object_hook=object_hook,
@@ -289,10 +2226,652 @@ def load(fp, encoding=None, cls=JSONTreeDecoder, object_hook=None,
     
 def loads(s, encoding=None, cls=JSONTreeDecoder, object_hook=None,
          parse_float=None, parse_int=None, parse_constant=None,
-         object_pairs_hook=None, **kargs):
+         object_pairs_hook=None, backend=None, **kargs):
     """JSON load from string function that defaults the loading class to be
-    JSONTreeDecoder
+    JSONTreeDecoder. See register_backend for the backend argument.
     """
-    return json.loads(s, encoding=encoding, cls=cls, object_hook=object_hook,
+    if (cls is JSONTreeDecoder and object_hook is None and parse_float is None
+            and parse_int is None and parse_constant is None
+            and object_pairs_hook is None):
+        result = _backend_loads(s, backend, kargs)
+        if result is not _backend_unused:
+            return result
+    if sys.version_info.major == 2:
+        kargs['encoding'] = encoding
+    return json.loads(s, cls=cls, object_hook=object_hook,
          parse_float=parse_float, parse_int=parse_int, parse_constant=parse_constant,
          object_pairs_hook=object_pairs_hook, **kargs)
+
+def _make_decoder(cls, object_hook, parse_float, parse_int, parse_constant,
+                  object_pairs_hook, kargs):
+    # Build a decoder the same way json.loads does, so the streaming loaders
+    # accept the same arguments as load/loads.
+    for name, value in (('object_hook', object_hook),
+                        ('parse_float', parse_float),
+                        ('parse_int', parse_int),
+                        ('parse_constant', parse_constant),
+                        ('object_pairs_hook', object_pairs_hook)):
+        if value is not None:
+            kargs[name] = value
+    return cls(**kargs)
+
+def iterload(fp, cls=JSONTreeDecoder, object_hook=None, parse_float=None,
+             parse_int=None, parse_constant=None, object_pairs_hook=None,
+             **kargs):
+    """Iterate over a JSON Lines (NDJSON) file, yielding one decoded record
+    per non-blank line. Only one line is held in memory at a time, and the
+    records are decoded exactly as load would decode them:
+    
+    >>> import io
+    >>> fp = io.StringIO(u'{"id": 1}\\n\\n{"id": 2, "at": "2013-04-29 22:45:35"}\\n')
+    >>> records = list(iterload(fp))
+    >>> [record.id for record in records]
+    [1, 2]
+    >>> records[1].at
+    datetime.datetime(2013, 4, 29, 22, 45, 35)
+    """
+    decoder = _make_decoder(cls, object_hook, parse_float, parse_int,
+                            parse_constant, object_pairs_hook, kargs)
+    for line in fp:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if line.strip():
+            yield decoder.decode(line)
+
+class _JSONStream(object):
+    """Incremental reader over a file object, decoding one JSON value at a
+    time from a buffer that only holds the values not yet consumed.
+    """
+    delimiters = (' ', '\t', '\n', '\r', ',', ']', '}')
+
+    def __init__(self, fp, decoder, chunk_size):
+        self.fp = fp
+        self.decoder = decoder
+        self.chunk_size = chunk_size
+        self.buf = u''
+        self.pos = 0
+        # Where buf starts in the file, in characters and lines, and where
+        # the line it starts in begins.
+        self.offset = 0
+        self.lineno = 1
+        self.line_start = 0
+        self.bytes_decoder = None
+        self.raw_decode = decoder.raw_decode
+        self.stats = self.counts = None
+        if isinstance(decoder, JSONTreeDecoder):
+            self.stats, self.counts = decoder._stream_stats()
+            if self.stats is not None:
+                # Decode without the per call report of the stats wrapper.
+                self.raw_decode = type(decoder).raw_decode.__get__(decoder)
+
+    def fill(self):
+        # Read at least as much as is buffered, so re-scanning a value that
+        # spans many chunks stays linear.
+        size = max(self.chunk_size, len(self.buf) - self.pos)
+        chunk = self.fp.read(size)
+        if not chunk:
+            return False
+        if isinstance(chunk, bytes):
+            if self.bytes_decoder is None:
+                self.bytes_decoder = codecs.getincrementaldecoder(
+                    'utf-8-sig')()
+            chunk = self.bytes_decoder.decode(chunk)
+        lines = self.buf.count('\n', 0, self.pos)
+        if lines:
+            self.lineno += lines
+            self.line_start = self.offset + self.buf.rindex(
+                '\n', 0, self.pos) + 1
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def truncated(self, exc):
+        # Whether decoding may only have failed because the value goes on
+        # past the buffered text: a string left open, or an error in the
+        # last few characters (a literal, number or escape cut short).
+        # Anything else is malformed whatever follows it.
+        pos = getattr(exc, 'pos', None)
+        if pos is None:
+            return True
+        return (pos >= len(self.buf) - 16 or
+                exc.msg.startswith('Unterminated string'))
+
+    def error(self, exc):
+        # exc with its position in the file rather than in buf.
+        if getattr(exc, 'pos', None) is None:
+            return exc
+        err = type(exc)(exc.msg, self.buf, exc.pos)
+        err.pos = self.offset + exc.pos
+        lines = self.buf.count('\n', 0, exc.pos)
+        if lines:
+            err.colno = exc.pos - self.buf.rindex('\n', 0, exc.pos)
+        else:
+            err.colno = err.pos - self.line_start + 1
+        err.lineno = self.lineno + lines
+        err.args = ('%s: line %d column %d (char %d)' %
+                    (exc.msg, err.lineno, err.colno, err.pos),)
+        return err
+
+    def peek(self):
+        while True:
+            self.pos = json.decoder.WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError("Expecting %s, found %s" %
+                             (' or '.join(repr(c) for c in chars),
+                              repr(char) if char else 'end of input'))
+        self.pos += 1
+        return char
+
+    def key(self):
+        self.expect('"')
+        while True:
+            try:
+                key, end = json.decoder.scanstring(self.buf, self.pos,
+                                                   self.decoder.strict)
+            except ValueError as exc:
+                if self.truncated(exc) and self.fill():
+                    continue
+                raise self.error(exc)
+            self.pos = end
+            self.expect(':')
+            return key
+
+    def value(self):
+        self.peek()
+        seconds = 0.0
+        while True:
+            if self.counts is not None:
+                # Forget what an attempt that is retried counted.
+                self.counts._take()
+            start = _timer()
+            try:
+                obj, end = self.raw_decode(self.buf, self.pos)
+            except ValueError as exc:
+                seconds += _timer() - start
+                if self.truncated(exc) and self.fill():
+                    continue
+                raise self.error(exc)
+            seconds += _timer() - start
+            # A number is only complete once a delimiter follows it, as a
+            # chunk boundary may fall anywhere in it (even after a '.').
+            if (self.buf[self.pos] in '-0123456789' and
+                    self.buf[end:end + 1] not in self.delimiters and
+                    self.fill()):
+                continue
+            if self.stats is not None:
+                _report_stats(self.stats, self.counts, obj,
+                              _utf8_size(self.buf, self.pos, end), seconds)
+            self.pos = end
+            return obj
+
+def iterload_array(fp, path=None, chunk_size=65536, cls=JSONTreeDecoder,
+                   object_hook=None, parse_float=None, parse_int=None,
+                   parse_constant=None, object_pairs_hook=None, **kargs):
+    """Iterate over the elements of a large JSON array in a file, yielding
+    them one at a time so only a single element is held in memory.
+    
+    By default the top level value must be the array. The path argument
+    (a sequence of keys, or a dotted string) names an array nested in
+    objects instead; the values of other keys on the way are decoded and
+    discarded. Elements are decoded exactly as load would decode them:
+    
+    >>> import io
+    >>> fp = io.StringIO(u'[{"id": 1}, {"id": 2}, "2013-04-29 22:45:35"]')
+    >>> list(iterload_array(fp))[1:]
+    [jsontree(<class 'jsontree.jsontree'>, {'id': 2}), datetime.datetime(2013, 4, 29, 22, 45, 35)]
+    >>> fp = io.StringIO(u'{"total": 2, "data": {"issues": [{"id": 1}, {"id": 2}]}}')
+    >>> [issue.id for issue in iterload_array(fp, path='data.issues')]
+    [1, 2]
+    
+    The file is read in chunk_size pieces, and values split across them
+    (even part way through a number) decode the same:
+    
+    >>> list(iterload_array(io.StringIO(u'[1.5, 2e3, -0.25]'), chunk_size=3))
+    [1.5, 2000.0, -0.25]
+    
+    A malformed element raises as soon as it is reached, with its position
+    in the file, rather than after reading the rest of it:
+    
+    >>> fp = io.StringIO(u'[{"id": 1}, {"id": x}' + u', {"id": 3}' * 100000 + u']')
+    >>> try:
+    ...     list(iterload_array(fp, chunk_size=64))
+    ... except ValueError as exc:
+    ...     print(exc, fp.tell() < 1000)
+    Expecting value: line 1 column 20 (char 19) True
+    """
+    decoder = _make_decoder(cls, object_hook, parse_float, parse_int,
+                            parse_constant, object_pairs_hook, kargs)
+    stream = _JSONStream(fp, decoder, chunk_size)
+    if path is None:
+        path = ()
+    elif isinstance(path, basestring):
+        path = path.split('.')
+    for name in path:
+        stream.expect('{')
+        if stream.peek() == '}':
+            raise KeyError(name)
+        while stream.key() != name:
+            stream.value()
+            if stream.expect(',}') == '}':
+                raise KeyError(name)
+    stream.expect('[')
+    if stream.peek() == ']':
+        return
+    while True:
+        yield stream.value()
+        if stream.expect(',]') == ']':
+            return
+
+def _write_chunks(fp, chunks, buffer_size):
+    # Coalesce the many small encoder chunks into buffer_size writes.
+    pending = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            fp.write(''.join(pending))
+            pending = []
+            size = 0
+    if pending:
+        fp.write(''.join(pending))
+
+_dump_split_size = 256
+
+def _splits(obj, size):
+    # Whether _iterencode_pieces splits obj into its members: an array or
+    # object of more than size members, or holding one.
+    if isinstance(obj, dict):
+        members = obj.values()
+    elif isinstance(obj, (list, tuple)):
+        members = obj
+    else:
+        return False
+    if len(obj) > size:
+        return True
+    for value in members:
+        if isinstance(value, (dict, list, tuple)) and len(value) > size:
+            return True
+    return False
+
+def _one_shot_encoder(encoder):
+    # encoder.encode, without setting up a new C encoder for every call.
+    make_encoder = json.encoder.c_make_encoder
+    if make_encoder is None or sys.version_info.major == 2:
+        return encoder.encode
+    if encoder.ensure_ascii:
+        encode_string = json.encoder.encode_basestring_ascii
+    else:
+        encode_string = json.encoder.encode_basestring
+    c_encoder = make_encoder({} if encoder.check_circular else None,
+                             encoder.default, encode_string, None,
+                             encoder.key_separator, encoder.item_separator,
+                             encoder.sort_keys, encoder.skipkeys,
+                             encoder.allow_nan)
+    return lambda obj: ''.join(c_encoder(obj, 0))
+
+def _iterencode_pieces(encode, encoder, obj, size, markers=None):
+    # Yield the same text as encoder.encode(obj), encoding the members of
+    # obj (and of the arrays and objects in it that _splits) one at a time
+    # with encode. Object members are encoded as single member objects with
+    # the braces cut off, which keeps the encoder's handling of every key
+    # type, skipkeys and ensure_ascii.
+    if not _splits(obj, size):
+        yield encode(obj)
+        return
+    if encoder.check_circular:
+        # The encoder only sees one piece at a time, so track the split
+        # arrays and objects being written like it tracks its own.
+        if markers is None:
+            markers = set()
+        if id(obj) in markers:
+            raise ValueError("Circular reference detected")
+        markers.add(id(obj))
+    for chunk in _iterencode_members(encode, encoder, obj, size, markers):
+        yield chunk
+    if markers is not None:
+        markers.discard(id(obj))
+
+def _iterencode_members(encode, encoder, obj, size, markers):
+    if isinstance(obj, dict):
+        items = obj.items()
+        if encoder.sort_keys:
+            items = sorted(items)
+        separator = '{'
+        for key, value in items:
+            if _splits(value, size):
+                head = encode({key: 0})[1:-2]
+                if head:
+                    yield separator + head
+                    for chunk in _iterencode_pieces(encode, encoder, value,
+                                                    size, markers):
+                        yield chunk
+                    separator = encoder.item_separator
+            else:
+                member = encode({key: value})[1:-1]
+                if member:
+                    yield separator + member
+                    separator = encoder.item_separator
+        yield '}' if separator != '{' else '{}'
+        return
+    # Runs of up to size members that are not split are encoded together,
+    # as an array with the brackets cut off.
+    separator = '['
+    run = []
+    for value in obj:
+        if not _splits(value, size):
+            run.append(value)
+            if len(run) < size:
+                continue
+            value = None
+        if run:
+            yield separator + encode(run)[1:-1]
+            separator = encoder.item_separator
+            run = []
+        if value is not None:
+            yield separator
+            for chunk in _iterencode_pieces(encode, encoder, value, size,
+                                            markers):
+                yield chunk
+            separator = encoder.item_separator
+    if run:
+        yield separator + encode(run)[1:-1]
+        separator = encoder.item_separator
+    yield ']' if separator != '[' else '[]'
+
+def dump_lines(records, fp, buffer_size=65536, cls=JSONTreeEncoder, **kargs):
+    """Write an iterable of records to a file as JSON Lines (NDJSON), one
+    record per line. Records are encoded one at a time and written in
+    buffer_size chunks, so memory does not grow with the output size. The
+    remaining keyword arguments are passed to the encoder class (indent
+    must be left as None for the output to be valid JSON Lines).
+    
+    >>> import io
+    >>> fp = io.StringIO()
+    >>> dump_lines((jsontree(id=i) for i in range(3)), fp)
+    >>> print(fp.getvalue().strip())
+    {"id": 0}
+    {"id": 1}
+    {"id": 2}
+    """
+    encoder = cls(**kargs)
+    def chunks():
+        for record in records:
+            yield encoder.encode(record)
+            yield '\n'
+    _write_chunks(fp, chunks(), buffer_size)
+
+def dump_iter(obj, fp, buffer_size=65536, cls=JSONTreeEncoder, **kargs):
+    """Write a large tree, or an iterable of records as a JSON array, to a
+    file with bounded memory. A mapping is written in pieces like dump
+    writes it, any other iterable (such as a generator) is written as an
+    array one record at a time; strings and bytes are rejected. Output is
+    written in buffer_size chunks and the remaining keyword arguments are
+    passed to the encoder class.
+    
+    >>> import io
+    >>> fp = io.StringIO()
+    >>> records = [jsontree(id=1), jsontree(at=datetime.datetime(2013, 4, 29))]
+    >>> dump_iter(iter(records), fp)
+    >>> fp.getvalue() == dumps(records)
+    True
+    >>> dump_iter('abc', fp)
+    Traceback (most recent call last):
+        ...
+    TypeError: dump_iter needs a mapping or an iterable of records, not str
+    """
+    if isinstance(obj, (basestring, bytes)):
+        raise TypeError("dump_iter needs a mapping or an iterable of records, "
+                        "not %s" % (type(obj).__name__,))
+    encoder = cls(**kargs)
+    if (kargs.get('indent') is None and cls is JSONTreeEncoder and
+            'stats' not in kargs):
+        encode = _one_shot_encoder(encoder)
+        def iterencode(obj):
+            return _iterencode_pieces(encode, encoder, obj, _dump_split_size)
+    else:
+        iterencode = encoder.iterencode
+    if isinstance(obj, collections_abc.Mapping):
+        _write_chunks(fp, iterencode(obj), buffer_size)
+        return
+    def chunks():
+        separator = '['
+        for record in obj:
+            yield separator
+            for chunk in iterencode(record):
+                yield chunk
+            separator = encoder.item_separator
+        yield ']' if separator != '[' else '[]'
+    _write_chunks(fp, chunks(), buffer_size)
+
+def _portable_options(kargs):
+    # Mapped jsontree classes are local classes which can not be pickled by
+    # reference, so send their mapping and re-create the class in the worker.
+    jsontreecls = kargs.get('jsontreecls')
+    mapping = getattr(jsontreecls, '_jsontree_mapping', None)
+    if mapping is not None:
+        kargs = dict(kargs)
+        kargs['jsontreecls'] = (_new_mapped_jsontree, mapping)
+    return kargs
+
+def _local_options(kargs):
+    jsontreecls = kargs.get('jsontreecls')
+    if isinstance(jsontreecls, tuple):
+        kargs = dict(kargs)
+        kargs['jsontreecls'] = mapped_jsontree_class(jsontreecls[1])
+    return kargs
+
+def _loads_chunk(documents, kargs):
+    kargs = _local_options(kargs)
+    return [loads(document, **kargs) for document in documents]
+
+def _load_files_chunk(paths, kargs):
+    kargs = _local_options(kargs)
+    results = []
+    for path in paths:
+        with open(path, 'rb') as fp:
+            results.append(loads(fp.read(), **kargs))
+    return results
+
+def _parallel(func, items, workers, chunksize, kargs):
+    if workers is None:
+        import multiprocessing
+        workers = multiprocessing.cpu_count()
+    if workers <= 1:
+        while True:
+            chunk = list(itertools.islice(items, chunksize))
+            if not chunk:
+                return
+            for result in func(chunk, kargs):
+                yield result
+    import concurrent.futures
+    kargs = _portable_options(kargs)
+    pending = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        while True:
+            # Keep two chunks per worker in flight so workers never wait,
+            # while only a bounded number of results is held in memory.
+            while len(pending) < workers * 2:
+                chunk = list(itertools.islice(items, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(func, chunk, kargs))
+            if not pending:
+                return
+            for result in pending.popleft().result():
+                yield result
+
+def loads_many(documents, workers=None, chunksize=64, **kargs):
+    """Decode an iterable of JSON documents across a pool of worker
+    processes, yielding the results in order.
+    
+    Documents are submitted in chunks of chunksize, with at most two chunks
+    per worker in flight, so memory stays bounded however long the input
+    is. The remaining keyword arguments are passed to loads in the workers
+    (jsontreecls, datetimedecoder, datetimekeys, frozen, ...) and must be
+    picklable, except that mapped_jsontree_class classes are re-created
+    from their mapping. workers defaults to the number of CPUs, and
+    workers=1 decodes in this process without a pool.
+    
+    >>> [tree.id for tree in loads_many(['{"id": 1}', '{"id": 2}'], workers=1)]
+    [1, 2]
+    """
+    return _parallel(_loads_chunk, iter(documents), workers, chunksize, kargs)
+
+def load_files(paths, workers=None, chunksize=8, **kargs):
+    """Like loads_many, but for an iterable of file paths which are read
+    and decoded in the worker processes.
+    """
+    return _parallel(_load_files_chunk, iter(paths), workers, chunksize,
+                     kargs)
+
+def _open_mmap(path):
+    with open(path, 'rb') as fp:
+        if not os.fstat(fp.fileno()).st_size:
+            return None
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+def load_path(path, mmap=True, **kargs):
+    """Decode the JSON file at path. With mmap=True the file is memory
+    mapped and decoded straight from the mapping, so only the decoded text
+    is held in memory rather than both the file contents read in and the
+    decoded text. The keyword arguments are passed to loads.
+    
+    Either way UTF-8, UTF-16 and UTF-32 files are accepted, telling them
+    apart the way json.loads does for bytes:
+    
+    >>> import os, tempfile
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'tree.json')
+    >>> with open(filename, 'wb') as fp:
+    ...     _ = fp.write(u'{"name": "caf\u00e9"}'.encode('utf-16'))
+    >>> load_path(filename).name, load_path(filename, mmap=False).name
+    ('café', 'café')
+    """
+    if not mmap:
+        with open(path, 'rb') as fp:
+            return loads(fp.read(), **kargs)
+    mapped = _open_mmap(path)
+    if mapped is None:
+        return loads('', **kargs)
+    try:
+        view = memoryview(mapped)
+        try:
+            text = str(view, json.detect_encoding(view[:4].tobytes()),
+                       'surrogatepass')
+        finally:
+            view.release()
+    finally:
+        mapped.close()
+    return loads(text, **kargs)
+
+_record_line_re = re.compile(br'(?m)^[ \t\r]*[^ \t\r\n][^\n]*')
+
+class JSONLinesFile(object):
+    """Random access to the records of a JSON Lines (NDJSON) file through a
+    memory map. Records are decoded from their byte offsets one at a time,
+    so the file is never copied into a python string.
+    
+    The record offsets are found with one scan of the file, or read from
+    the sidecar index file (path + '.idx' by default) when index is True
+    and the sidecar matches the file (by size and modification time); a
+    new sidecar is then written so the
+    scan only happens once. The remaining keyword arguments are passed to
+    the decoder as with load.
+    
+    >>> import os, tempfile
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'records.ndjson')
+    >>> with open(filename, 'w') as fp:
+    ...     dump_lines((jsontree(id=i) for i in range(5)), fp)
+    >>> with JSONLinesFile(filename, index=True) as records:
+    ...     len(records), records[3].id, [r.id for r in records][-1]
+    (5, 3, 4)
+    >>> os.path.exists(filename + '.idx')
+    True
+    """
+    def __init__(self, path, index=False, index_path=None,
+                 cls=JSONTreeDecoder, **kargs):
+        self.path = path
+        self.index_path = index_path or path + '.idx'
+        self.decoder = cls(**kargs)
+        self.mmap = _open_mmap(path)
+        self.stamp = self._stamp()
+        self.offsets = None
+        if index:
+            self.offsets = self._read_index()
+        if self.offsets is None:
+            self.offsets = self.build_index()
+            if index:
+                self.save_index()
+    
+    def build_index(self):
+        """Scan the file and return the array of record start offsets."""
+        offsets = array.array('Q')
+        if self.mmap is not None:
+            offsets.extend(match.start() for match in
+                           _record_line_re.finditer(self.mmap))
+        return offsets
+    
+    def _stamp(self):
+        # The size and modification time (in nanoseconds) of the file.
+        stat = os.stat(self.path)
+        mtime = getattr(stat, 'st_mtime_ns', None)
+        if mtime is None:
+            mtime = int(stat.st_mtime * 1e9)
+        return array.array('Q', [stat.st_size, max(mtime, 0)])
+    
+    def _read_index(self):
+        # The sidecar holds the file stamp followed by the record offsets.
+        try:
+            with open(self.index_path, 'rb') as fp:
+                offsets = array.array('Q')
+                offsets.frombytes(fp.read())
+        except (IOError, OSError, ValueError):
+            return None
+        if offsets[:len(self.stamp)] != self.stamp:
+            return None
+        return offsets[len(self.stamp):]
+    
+    def save_index(self):
+        """Write the record offsets to the sidecar index file."""
+        with open(self.index_path, 'wb') as fp:
+            self.stamp.tofile(fp)
+            self.offsets.tofile(fp)
+    
+    def _decode(self, start):
+        end = self.mmap.find(b'\n', start)
+        if end < 0:
+            end = len(self.mmap)
+        view = memoryview(self.mmap)
+        try:
+            return self.decoder.decode(str(view[start:end], 'utf-8'))
+        finally:
+            view.release()
+    
+    def __len__(self):
+        return len(self.offsets)
+    
+    def __getitem__(self, index):
+        return self._decode(self.offsets[index])
+    
+    def __iter__(self):
+        for start in self.offsets:
+            yield self._decode(start)
+    
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,142 @@
+"""asyncio counterparts of the jsontree load and dump functions, reading
+from an asyncio.StreamReader and writing to an asyncio.StreamWriter.
+
+This is a separate module as it needs python 3.7 or newer (for
+asyncio.get_running_loop and asyncio.run).
+
+>>> import asyncio, socket
+>>> from jsontree import jsontree
+>>> from jsontree_async import adump_lines, aload_lines
+>>> async def roundtrip(records):
+...     left, right = socket.socketpair()
+...     reader, reader_side = await asyncio.open_connection(sock=left)
+...     writer_side, writer = await asyncio.open_connection(sock=right)
+...     await adump_lines(writer, records)
+...     writer.close()
+...     result = [record async for record in aload_lines(reader)]
+...     reader_side.close()
+...     return result
+>>> records = [jsontree(id=1), jsontree(id=2)]
+>>> [record.id for record in asyncio.run(roundtrip(records))]
+[1, 2]
+"""
+import asyncio
+import functools
+
+import jsontree
+
+
+def _decode(text, offload_size, executor, kargs, decoder):
+    # Return the decoded value, or an awaitable when the document is large
+    # enough to be decoded in the executor.
+    if offload_size is not None and len(text) >= offload_size:
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            executor, functools.partial(jsontree.loads, text, **kargs))
+    return decoder.decode(text)
+
+
+async def aload_lines(reader, chunk_size=65536, offload_size=None,
+                      executor=None, **kargs):
+    """Asynchronously iterate over the records of a JSON Lines stream read
+    from an asyncio.StreamReader, yielding one decoded record per non-blank
+    line. Lines are not limited by the reader's line length limit.
+    
+    Lines of at least offload_size bytes are decoded with loop's
+    run_in_executor, in executor (the default thread pool when None), so
+    large records do not block the event loop. The remaining keyword
+    arguments are passed to the decoder as with jsontree.load.
+    """
+    decoder = jsontree.JSONTreeDecoder(**kargs)
+    pending = []
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            break
+        lines = chunk.split(b'\n')
+        if len(lines) == 1:
+            pending.append(chunk)
+            continue
+        pending.append(lines[0])
+        lines[0] = b''.join(pending)
+        pending = [lines.pop()]
+        for line in lines:
+            if line.strip():
+                record = _decode(line.decode('utf-8'), offload_size,
+                                 executor, kargs, decoder)
+                if isinstance(record, asyncio.Future):
+                    record = await record
+                yield record
+    line = b''.join(pending)
+    if line.strip():
+        record = _decode(line.decode('utf-8'), offload_size, executor,
+                         kargs, decoder)
+        if isinstance(record, asyncio.Future):
+            record = await record
+        yield record
+
+
+async def aload(reader, offload_size=None, executor=None, **kargs):
+    """Read a whole JSON document from an asyncio.StreamReader and decode it,
+    in executor when it is at least offload_size bytes.
+    """
+    text = (await reader.read()).decode('utf-8')
+    value = _decode(text, offload_size, executor, kargs,
+                    jsontree.JSONTreeDecoder(**kargs))
+    if isinstance(value, asyncio.Future):
+        value = await value
+    return value
+
+
+async def adump_lines(writer, records, drain_size=65536,
+                      cls=jsontree.JSONTreeEncoder, **kargs):
+    """Write records, from an iterable or an asynchronous iterable, to an
+    asyncio.StreamWriter as JSON Lines. Output is written in drain_size
+    batches, awaiting writer.drain() after each so a slow reader applies
+    backpressure. The remaining keyword arguments are passed to the encoder
+    class.
+    """
+    encoder = cls(**kargs)
+    pending = []
+    size = 0
+    async def write():
+        writer.write(''.join(pending).encode('utf-8'))
+        del pending[:]
+        await writer.drain()
+    if hasattr(records, '__aiter__'):
+        async for record in records:
+            pending.append(encoder.encode(record) + '\n')
+            size += len(pending[-1])
+            if size >= drain_size:
+                await write()
+                size = 0
+    else:
+        for record in records:
+            pending.append(encoder.encode(record) + '\n')
+            size += len(pending[-1])
+            if size >= drain_size:
+                await write()
+                size = 0
+    if pending:
+        await write()
+
+
+async def adump(writer, obj, drain_size=65536, cls=jsontree.JSONTreeEncoder,
+                **kargs):
+    """Write obj to an asyncio.StreamWriter as a JSON document, streaming the
+    encoder's output in drain_size batches and awaiting writer.drain()
+    after each.
+    """
+    pending = []
+    size = 0
+    for chunk in cls(**kargs).iterencode(obj):
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= drain_size:
+            writer.write(''.join(pending).encode('utf-8'))
+            pending = []
+            size = 0
+            await writer.drain()
+    if pending:
+        writer.write(''.join(pending).encode('utf-8'))
+        await writer.drain()
@@ -12,7 +12,7 @@ setup(
     author=jsontree.__author__,
     author_email=jsontree.__email__,
     license="BSD",
-    py_modules=['jsontree'],
+    py_modules=['jsontree', 'jsontree_async'],
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Environment :: Web Environment",